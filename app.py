@@ -1,20 +1,41 @@
 import os
 import json
-import requests
 from datetime import datetime
-from flask import Flask, request, redirect, url_for, session, jsonify, render_template
+from flask import Flask, request, redirect, url_for, session, jsonify, render_template, Response, stream_with_context, g, has_request_context
 from flask_cors import CORS
 import google.generativeai as genai
 from dotenv import load_dotenv
-import mysql.connector
 import re
+import time
+import hashlib
+import threading
+from contextlib import contextmanager, nullcontext
 try:
     from googletrans import Translator
     translator = Translator()
 except ImportError:
     translator = None
-import pandas as pd
 from werkzeug.utils import secure_filename
+import mysql.connector
+from db import ConnectionPool, PoolExhaustedError
+from catalog_cache import CatalogCache
+from product_search import search_products, product_to_dict
+from catalog_import import import_catalog, ImportRejected
+from llm_stream import AsyncLLMRunner
+from session_store import SessionStore, RedisSessionBackend, LocalKeyValueStore
+from translation import TranslationCache, TranslationService
+from intent_router import IntentRouter
+from response_cache import ResponseCache, NgramMatcher
+from resilience import ConcurrencyGate, TokenBucketLimiter, CircuitBreaker, AdmissionRejected, RateLimited, CircuitOpenError
+from conversation import ConversationContext, TranscriptStore, fallback_summary, entry_role, entry_text
+from order_service import place_order, EmptyCartError
+from cart import CartService, UnknownProductError
+from recommend import CoPurchaseIndex, iter_order_lines
+from order_messages import OrderNotFoundError, order_owner, has_thread, send_message, list_messages
+from event_hub import EventHub
+from order_queries import list_orders, parse_date, revenue_per_day, top_products, units_per_category
+from metrics import MetricsRegistry, StageTimer
+from oauth_client import GoogleOAuthClient, OAuthError
 
 load_dotenv()
 
@@ -30,74 +51,137 @@ MYSQL_USER = os.getenv('MYSQL_USER', 'root')
 MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '')
 MYSQL_DB = os.getenv('MYSQL_DB', 'grocery_db')
 
+db_pool = ConnectionPool(
+    size=int(os.getenv('MYSQL_POOL_SIZE', '5')),
+    checkout_timeout=float(os.getenv('MYSQL_POOL_TIMEOUT', '10')),
+    ping_interval=float(os.getenv('MYSQL_POOL_PING_INTERVAL', '30')),
+    max_lifetime=float(os.getenv('MYSQL_POOL_MAX_LIFETIME', '1800')),
+    host=MYSQL_HOST,
+    user=MYSQL_USER,
+    password=MYSQL_PASSWORD,
+    database=MYSQL_DB
+)
+
+# Hot-path instrumentation, scraped from /metrics
+metrics = MetricsRegistry()
+chat_request_seconds = metrics.histogram(
+    'chat_request_seconds', 'Time to answer a chat message.', ('endpoint', 'intent'))
+chat_stage_seconds = metrics.histogram(
+    'chat_stage_seconds', 'Time spent in each stage of a chat request.', ('stage', 'intent'))
+chat_errors = metrics.counter('chat_errors_total', 'Errors raised while answering chat messages.', ('endpoint', 'kind'))
+chat_fallbacks = metrics.counter('chat_fallbacks_total', 'Chat replies served by a fallback path.', ('reason',))
+
+def stage(name):
+    # Times a step of the current chat request; a no-op anywhere else.
+    timer = g.get('stage_timer') if has_request_context() else None
+    return timer.stage(name) if timer is not None else nullcontext()
+
+def record_chat_metrics(endpoint, timer):
+    intent = timer.intent or 'unknown'
+    for name, seconds in timer.stages.items():
+        chat_stage_seconds.observe(seconds, stage=name, intent=intent)
+    chat_request_seconds.observe(timer.elapsed(), endpoint=endpoint, intent=intent)
+
+@contextmanager
 def get_db_connection():
-    return mysql.connector.connect(
-        host=MYSQL_HOST,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=MYSQL_DB
-    )
+    timer = g.get('stage_timer') if has_request_context() else None
+    if timer is None:
+        with db_pool.connection() as conn:
+            yield conn
+        return
+    started = time.perf_counter()
+    try:
+        with db_pool.connection() as conn:
+            timer.add('db_connect', time.perf_counter() - started)
+            # Everything done while the connection is checked out counts as query time.
+            with timer.stage('db_query'):
+                yield conn
+    except (mysql.connector.Error, PoolExhaustedError):
+        # Only failures of the database itself; errors raised by the caller's own code pass through.
+        chat_errors.inc(endpoint=request.endpoint, kind='db')
+        raise
 
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
-GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
+GOOGLE_DISCOVERY_URL = os.getenv('GOOGLE_DISCOVERY_URL', "https://accounts.google.com/.well-known/openid-configuration")
+GOOGLE_REDIRECT_URI = os.getenv('GOOGLE_REDIRECT_URI', 'http://localhost:5000/auth/google/callback')
+
+oauth_client = GoogleOAuthClient(
+    GOOGLE_DISCOVERY_URL,
+    GOOGLE_CLIENT_ID,
+    GOOGLE_CLIENT_SECRET,
+    GOOGLE_REDIRECT_URI,
+    timeout=(float(os.getenv('OAUTH_CONNECT_TIMEOUT', '3.05')), float(os.getenv('OAUTH_READ_TIMEOUT', '10')))
+)
 
 ADMIN_EMAILS = set(os.getenv('ADMIN_EMAILS', '').split(',')) if os.getenv('ADMIN_EMAILS') else {"admin@example.com"}
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 genai.configure(api_key=GEMINI_API_KEY)
 
-try:
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    print("Gemini 2.5 Flash model initialized successfully")
-    
-    # Set up the chat with system instruction
-    chat = model.start_chat(history=[])
-    chat.send_message("""
-    You are a helpful grocery shopping assistant. Help users find products, 
-    manage their shopping cart, and answer grocery-related questions. 
-    Be friendly, concise, and helpful. Keep responses brief and to the point.
-    """)
-    
-except Exception as e:
-    print(f"Error initializing Gemini model: {str(e)}")
-    print("Falling back to a simple response system")
-    
-    class SimpleModel:
-        def __init__(self):
-            self.history = []
-        
-        def start_chat(self, history=None):
-            self.history = history or []
-            return self
-        
-        def send_message(self, message):
-            responses = [
-                "I'm your grocery assistant. How can I help you today?",
-                "I can help you find products and manage your shopping list.",
-                "Would you like me to add anything to your cart?",
-                "I found some great deals on fresh produce today!",
-                "Your cart currently has 3 items."
-            ]
-            import random
-            response = random.choice(responses)
-            return type('obj', (object,), {'text': response})
-    
-    model = SimpleModel()
-    print("Using simple response system")
+# Shared event loop for all outbound Gemini calls
+llm_runner = AsyncLLMRunner()
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '60'))
 
-# In-memory storage for chat sessions
-chat_sessions = {}
+def create_response_cache():
+    # Opt-in: cached answers skip the user's own conversation context.
+    mode = os.getenv('LLM_RESPONSE_CACHE', 'off')
+    if mode not in ('exact', 'similar'):
+        return None
+    matcher = None
+    if mode == 'similar':
+        matcher = NgramMatcher(threshold=float(os.getenv('LLM_RESPONSE_CACHE_SIMILARITY', '0.85')))
+    return ResponseCache(
+        max_entries=int(os.getenv('LLM_RESPONSE_CACHE_SIZE', '5000')),
+        ttl=float(os.getenv('LLM_RESPONSE_CACHE_TTL', '3600')),
+        matcher=matcher
+    )
 
-# Supported languages
-SUPPORTED_LANGUAGES = [
-    {'code': 'en', 'name': 'English'},
-    {'code': 'es', 'name': 'Español'},
-    {'code': 'fr', 'name': 'Français'},
-    {'code': 'de', 'name': 'Deutsch'},
-    {'code': 'ur', 'name': 'اردو'},
-    {'code': 'ar', 'name': 'العربية'},
-]
+response_cache = create_response_cache()
+
+# Admission control for outbound AI and translation calls
+llm_gate = ConcurrencyGate(
+    'gemini',
+    limit=int(os.getenv('LLM_MAX_CONCURRENCY', '8')),
+    max_waiting=int(os.getenv('LLM_MAX_WAITING', '16')),
+    timeout=float(os.getenv('LLM_QUEUE_TIMEOUT', '5'))
+)
+llm_rate_limiter = TokenBucketLimiter(
+    rate=float(os.getenv('LLM_USER_RATE', '0.5')),
+    burst=int(os.getenv('LLM_USER_BURST', '5'))
+)
+llm_breaker = CircuitBreaker(
+    'gemini',
+    failure_threshold=int(os.getenv('LLM_BREAKER_FAILURES', '5')),
+    reset_timeout=float(os.getenv('LLM_BREAKER_RESET', '30'))
+)
+
+@contextmanager
+def llm_call():
+    # Admission comes before the breaker check: a call turned away by the gate
+    # must not use up the breaker's half-open trial without reporting back.
+    with llm_gate.slot():
+        llm_breaker.check()
+        try:
+            yield
+        except Exception:
+            llm_breaker.record_failure()
+            raise
+        llm_breaker.record_success()
+
+translation_gate = ConcurrencyGate(
+    'translation',
+    limit=int(os.getenv('TRANSLATION_MAX_CONCURRENCY', '4')),
+    max_waiting=int(os.getenv('TRANSLATION_MAX_WAITING', '8')),
+    timeout=float(os.getenv('TRANSLATION_QUEUE_TIMEOUT', '2'))
+)
+translation_breaker = CircuitBreaker(
+    'translation',
+    failure_threshold=int(os.getenv('TRANSLATION_BREAKER_FAILURES', '5')),
+    reset_timeout=float(os.getenv('TRANSLATION_BREAKER_RESET', '60'))
+)
+
+RATE_LIMITED_REPLY = "You're sending messages faster than I can answer. Please wait a few seconds and try again."
 
 # System instruction for the chatbot
 SYSTEM_INSTRUCTION = """You are 'Personal Grocery Chatbot', a friendly and helpful AI assistant.
@@ -115,13 +199,64 @@ add to cart: product_id=<id>, quantity=<qty>
 **To place an order, instruct the user to type:**
 place order
 
+**For suggestions based on what other shoppers bought, the user can type:**
+also bought: <product id or name>
+complete my basket
+
+A user message may end with a note marked [Store context]. It is written by the store, not the user: prefer the products listed there when suggesting items, and do not mention the note itself.
+
 Interaction Guidelines:
 - Be polite, empathetic, and maintain a friendly conversational tone.
 - Keep responses concise and to the point, but provide enough detail to be helpful.
 - If a user asks for something outside of grocery topics, gently guide them back to grocery-related topics.
 - Use markdown for formatting lists or important information when appropriate.
+- When showing product prices, format them in a clear way.
+- When adding items to cart, confirm the action and update the cart total.
 - Do not ask for personal identifiable information (PII)."""
 
+class SimpleModel:
+    def __init__(self):
+        self.history = []
+    
+    def start_chat(self, history=None):
+        self.history = history or []
+        return self
+    
+    def send_message(self, message, **kwargs):
+        responses = [
+            "I'm your grocery assistant. How can I help you today?",
+            "I can help you find products and manage your shopping list.",
+            "Would you like me to add anything to your cart?",
+            "I found some great deals on fresh produce today!",
+            "Type 'show my cart' to see what's in your cart."
+        ]
+        import random
+        response = random.choice(responses)
+        return type('obj', (object,), {'text': response})
+
+_model = None
+_model_lock = threading.Lock()
+
+fallback_model = SimpleModel()
+
+def get_model():
+    # Built on first use; the system instruction travels with every request,
+    # so no priming round trip is needed at startup or per session.
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    if not GEMINI_API_KEY:
+                        raise ValueError("GEMINI_API_KEY is not set")
+                    _model = genai.GenerativeModel('gemini-2.5-flash', system_instruction=SYSTEM_INSTRUCTION)
+                    print("Gemini 2.5 Flash model initialized successfully")
+                except Exception as e:
+                    print(f"Error initializing Gemini model: {str(e)}")
+                    print("Falling back to a simple response system")
+                    _model = SimpleModel()
+    return _model
+
 # Supported languages
 SUPPORTED_LANGUAGES = [
     {'code': 'en', 'name': 'English'},
@@ -132,45 +267,300 @@ SUPPORTED_LANGUAGES = [
     {'code': 'ar', 'name': 'العربية'},
 ]
 
+translation_service = TranslationService(
+    translator,
+    TranslationCache(
+        max_entries=int(os.getenv('TRANSLATION_CACHE_SIZE', '10000')),
+        path=os.getenv('TRANSLATION_CACHE_PATH') or None
+    ),
+    gate=translation_gate,
+    breaker=translation_breaker
+)
+
+# Fixed bot strings translated ahead of time for every supported language
+RESPONSE_TEMPLATES = [
+    "Hello! How can I help you with your grocery shopping today?",
+    "Available products:",
+    "No products available.",
+    "Matching products:",
+    "No matching products found.",
+    "Your cart is empty. Add products before placing an order.",
+    "I didn't get a proper response.",
+    "I'm having trouble connecting to the AI service right now. Please try again later.",
+    "Usage: search products: <keywords>, category=<name>, min_price=<n>, max_price=<n>",
+    "Your cart is empty.",
+    "No orders found.",
+    "Your cart is empty. Add a few products and I can suggest what goes with them.",
+    "No recommendations yet for these products.",
+]
+
+if translation_service.available and os.getenv('TRANSLATION_PREWARM', '1') == '1':
+    threading.Thread(
+        target=translation_service.prewarm,
+        args=(RESPONSE_TEMPLATES, [lang['code'] for lang in SUPPORTED_LANGUAGES]),
+        name='translation-prewarm',
+        daemon=True
+    ).start()
+
+def load_active_products():
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, description, category, price, stock FROM product_catalog WHERE is_active=1 AND stock > 0")
+        products = cursor.fetchall()
+        cursor.close()
+    return products
+
+def load_active_product(product_id):
+    # One row in the same shape as load_active_products, for lookups between catalog loads.
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, name, description, category, price, stock FROM product_catalog "
+            "WHERE id = %s AND is_active=1 AND stock > 0",
+            (product_id,)
+        )
+        product = cursor.fetchone()
+        cursor.close()
+    return product
+
+def render_product_listing(products, language):
+    if products:
+        lines = ["Available products:"]
+        lines.extend(f"- ID: {p[0]}, {p[1]} ({p[3]}): {p[2]} | Price: ${p[4]:.2f} | Stock: {p[5]}" for p in products)
+        text = "\n".join(lines) + "\n"
+    else:
+        text = "No products available."
+    if language != 'en':
+        text = translation_service.translate(text, language)
+    return text
+
+def parse_search_command(text):
+    filters = {'keyword': None, 'category': None, 'min_price': None, 'max_price': None, 'after_id': None}
+    keywords = []
+    for part in text.split(','):
+        key, sep, value = part.partition('=')
+        key = key.strip().lower()
+        value = value.strip()
+        if sep and key == 'category':
+            filters['category'] = value
+        elif sep and key in ('min_price', 'max_price'):
+            filters[key] = float(value)
+        elif sep and key == 'after':
+            filters['after_id'] = int(value)
+        elif part.strip():
+            keywords.append(part.strip())
+    filters['keyword'] = ' '.join(keywords) or None
+    return filters
+
+def render_search_results(rows, next_cursor, command):
+    if not rows:
+        return "No matching products found."
+    lines = ["Matching products:"]
+    lines.extend(f"- ID: {p[0]}, {p[1]} ({p[3]}): {p[2]} | Price: ${p[4]:.2f} | Stock: {p[5]}" for p in rows)
+    if next_cursor is not None:
+        base = re.sub(r",?\s*after\s*=\s*\d+", "", command).strip()
+        lines.append(f"More results: search products: {base}, after={next_cursor}")
+    return "\n".join(lines)
+
+catalog_cache = CatalogCache(
+    load_active_products,
+    ttl=float(os.getenv('CATALOG_CACHE_TTL', '300')),
+    fetch_one=load_active_product
+)
+
+# Pushes new orders and order messages to open dashboards and chat pages
+event_hub = EventHub(
+    history=int(os.getenv('EVENTS_HISTORY', '1000')),
+    max_queue=int(os.getenv('EVENTS_MAX_QUEUE', '256'))
+)
+EVENTS_HEARTBEAT = float(os.getenv('EVENTS_HEARTBEAT', '15'))
+EVENTS_MAX_STREAM_SECONDS = float(os.getenv('EVENTS_MAX_STREAM_SECONDS', '300'))
+EVENTS_POLL_WAIT = float(os.getenv('EVENTS_POLL_WAIT', '10'))
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+def post_order_message(order_id, user_id, is_admin, text):
+    """Store a message on an order and push it to the admins and the order's owner.
+
+    The order's owner writes as ``user``; anyone else must be an admin and
+    writes as ``admin``. Raises ``OrderNotFoundError`` for orders the caller
+    may not see and ``ValueError`` for an empty or oversized message.
+    """
+    with get_db_connection() as conn:
+        owner = order_owner(conn, order_id)
+        if owner != user_id and not is_admin:
+            raise OrderNotFoundError(f"Order {order_id} not found")
+        message = send_message(conn, order_id, 'user' if owner == user_id else 'admin', text)
+    event_hub.publish(['admin', user_channel(owner)], 'order_message', message)
+    return message
+
+RECOMMEND_LIMIT = int(os.getenv('RECOMMEND_LIMIT', '5'))
+
+copurchase_index = CoPurchaseIndex(
+    lambda: iter_order_lines(get_db_connection),
+    min_pair_count=int(os.getenv('RECOMMEND_MIN_PAIR_COUNT', '2')),
+    rebuild_interval=float(os.getenv('RECOMMEND_REBUILD_INTERVAL', '86400'))
+)
+
+def available_recommendations(scored, limit=RECOMMEND_LIMIT):
+    # Only active, in-stock products are worth suggesting.
+    products = []
+    for product_id, _ in scored:
+        product = catalog_cache.get_product(product_id)
+        if product is not None:
+            products.append(product)
+            if len(products) == limit:
+                break
+    return products
+
+def render_recommendations(title, products):
+    if not products:
+        return "No recommendations yet for these products."
+    lines = [title]
+    lines.extend(f"- ID: {p[0]}, {p[1]} ({p[3]}) | ${p[4]:.2f}" for p in products)
+    return "\n".join(lines)
+
+def find_product(reference):
+    if reference.isdigit():
+        return catalog_cache.get_product(int(reference))
+    needle = reference.lower()
+    _, products = catalog_cache.get()
+    return next((p for p in products if needle in p[1].lower()), None)
+
+cart_service = CartService(
+    get_db_connection,
+    catalog_cache.get_product,
+    ttl=float(os.getenv('CART_CACHE_TTL', '300')),
+    max_users=int(os.getenv('CART_CACHE_USERS', '10000'))
+)
+
+LLM_CONTEXT_TOKENS = int(os.getenv('LLM_CONTEXT_TOKENS', '4000'))
+
+transcript_store = TranscriptStore(
+    get_db_connection,
+    batch_size=int(os.getenv('TRANSCRIPT_BATCH_SIZE', '100')),
+    flush_interval=float(os.getenv('TRANSCRIPT_FLUSH_INTERVAL', '2'))
+)
+
+def summarize_turns(previous_summary, turns):
+    model = get_model()
+    if isinstance(model, SimpleModel):
+        return fallback_summary(previous_summary, turns)
+    transcript = "\n".join(f"{entry_role(turn)}: {entry_text(turn)}" for turn in turns)
+    prompt = (
+        "Update the running summary of a grocery shopping conversation. Keep the user's preferences, "
+        "dietary needs, products and quantities discussed, and any open requests. "
+        "Answer with the new summary only, in at most 150 words.\n\n"
+        f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"
+    )
+    try:
+        # Same admission as chat replies, so a slow Gemini cannot hold workers in compaction either.
+        with llm_call():
+            return llm_runner.generate(model, prompt, timeout=LLM_TIMEOUT).strip()
+    except (AdmissionRejected, CircuitOpenError) as e:
+        print(f"Summarizing conversation skipped: {e}")
+        return fallback_summary(previous_summary, turns)
+    except Exception as e:
+        print(f"Summarizing conversation failed: {e}")
+        return fallback_summary(previous_summary, turns)
+
 class ChatSession:
-    def __init__(self, user_id):
+    def __init__(self, user_id, messages=None, next_message_id=1, summary=''):
         self.user_id = user_id
-        self.messages = [
-            {
-                'role': 'assistant',
-                'text': 'Hello! How can I help you with your grocery shopping today?',
-                'timestamp': datetime.now().isoformat()
-            }
-        ]
-        self.cart = []
+        self.messages = messages or []
+        self.context = ConversationContext(summarize_turns, token_budget=LLM_CONTEXT_TOKENS, summary=summary)
+        # Ids only ever grow, even after old messages are trimmed, so clients can ask for deltas.
+        self.next_message_id = next_message_id
+        if not self.messages:
+            self.add_message('assistant', 'Hello! How can I help you with your grocery shopping today?')
         self.language = 'en'  
         self.current_language = 'en'
-        
+        self._chat = None
+
+    @property
+    def cart(self):
         try:
-            self.chat = model.start_chat(history=[])
-            print(f"Created new chat session for user {user_id}")
+            return cart_service.get(self.user_id).to_dict()
         except Exception as e:
-            print(f"Error initializing chat model: {str(e)}")
-            self.chat = None
-
-        self.chat.send_message(
-            "You are a helpful grocery shopping assistant. "
-            "Help users find products, manage their shopping cart, "
-            "and answer questions about groceries. Be friendly and concise. "
-            "When showing product prices, format them in a clear way. "
-            "When adding items to cart, confirm the action and update the cart total."
-        )
+            print(f"Failed to load cart for user {self.user_id}: {e}")
+            return None
+
+    @property
+    def chat(self):
+        # The model chat is only started when the user first needs the AI.
+        if self._chat is None:
+            messages = self.messages
+            if messages and messages[-1]['role'] == 'user':
+                # The turn being answered is sent with send_message, not replayed as history.
+                messages = messages[:-1]
+            self._chat = get_model().start_chat(history=self.context.build_history(messages))
+            print(f"Started model chat for user {self.user_id}")
+        return self._chat
+
+    def is_standalone(self):
+        """Whether the model sees no earlier turns of this conversation when answering the next one."""
+        if self.context.summary:
+            return False
+        return not any(entry_role(entry) == 'user' for entry in self.chat.history)
+
+    def compact_context(self):
+        # Folds old turns into the rolling summary once the model history exceeds its budget.
+        if self._chat is None:
+            return
+        history = self.context.compact(list(self._chat.history))
+        if history is None:
+            return
+        self._chat = get_model().start_chat(history=history)
+        try:
+            transcript_store.save_summary(self.user_id, self.context.summary)
+        except Exception as e:
+            print(f"Failed to save conversation summary: {e}")
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'messages': self.messages,
+            'next_message_id': self.next_message_id,
+            'summary': self.context.summary,
+            'language': self.language,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        messages = data.get('messages') or []
+        next_message_id = data.get('next_message_id')
+        if next_message_id is None:
+            # Saved before messages carried ids: number them in order.
+            for number, message in enumerate(messages, start=1):
+                message['id'] = number
+            next_message_id = len(messages) + 1
+        chat_session = cls(data['user_id'], messages=messages, next_message_id=next_message_id,
+                           summary=data.get('summary', ''))
+        chat_session.language = data.get('language', 'en')
+        return chat_session
 
     def add_message(self, role, text):
         message = {
-            'id': str(len(self.messages) + 1),
+            'id': self.next_message_id,
             'role': role,
             'text': text,
             'timestamp': datetime.now().isoformat()
         }
+        self.next_message_id += 1
         self.messages.append(message)
+        transcript_store.append(self.user_id, message)
         return message
 
+    @property
+    def last_message_id(self):
+        return self.next_message_id - 1
+
+    def messages_since(self, since_id):
+        if since_id is None:
+            return list(self.messages)
+        return [message for message in self.messages if message['id'] > since_id]
+
     async def get_ai_response(self, user_input):
         try:
             self.add_message('user', user_input)
@@ -185,6 +575,38 @@ class ChatSession:
             error_message = f"Sorry, I encountered an error: {str(e)[:100]}"
             return self.add_message('model', error_message)
 
+def load_chat_session(user_id):
+    # A user seen before a restart gets their recent transcript and summary back,
+    # without the full conversation being replayed to the model.
+    try:
+        messages, summary = transcript_store.load(user_id)
+    except Exception as e:
+        print(f"Failed to load transcript for user {user_id}: {e}")
+        messages, summary = [], ''
+    if not messages:
+        return ChatSession(user_id, summary=summary)
+    return ChatSession(user_id, messages=messages, next_message_id=messages[-1]['id'] + 1, summary=summary)
+
+def create_session_backend():
+    url = os.getenv('SESSION_STORE_URL')
+    if not url:
+        return None
+    if url == 'local://':
+        return RedisSessionBackend(LocalKeyValueStore())
+    import redis
+    return RedisSessionBackend(
+        redis.Redis.from_url(url),
+        ttl=int(os.getenv('SESSION_STORE_TTL', str(7 * 24 * 3600)))
+    )
+
+chat_store = SessionStore(
+    load_chat_session,
+    ChatSession.from_dict,
+    max_sessions=int(os.getenv('MAX_CHAT_SESSIONS', '1000')),
+    idle_ttl=float(os.getenv('CHAT_SESSION_IDLE_TTL', '1800')),
+    backend=create_session_backend()
+)
+
 @app.route('/')
 def index():
     if 'user' not in session:
@@ -193,16 +615,22 @@ def index():
     view_mode = session.get('view_mode', 'admin' if session.get('is_admin') else 'user')
     if session.get('is_admin') and view_mode == 'admin':
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SHOW COLUMNS FROM product_catalog")
-        columns = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SHOW COLUMNS FROM product_catalog")
+            columns = cursor.fetchall()
+            cursor.close()
         return render_template('admin_dashboard.html', admin=session['user'], columns=columns, view_mode='admin')
 
+    try:
+        with get_db_connection() as conn:
+            order_thread = has_thread(conn, session['user']['id'])
+    except Exception as e:
+        print(f"Checking for order messages failed: {e}")
+        order_thread = False
     return render_template('index.html', 
                          user=session['user'], 
+                         order_thread=order_thread,
                          supported_languages=SUPPORTED_LANGUAGES,
                          current_language=session.get('current_language', 'en'),
                          api_key_configured=bool(os.getenv('GEMINI_API_KEY')),
@@ -223,16 +651,10 @@ def login():
 
 @app.route('/auth/google')
 def google_auth():
-    google_provider_cfg = requests.get(GOOGLE_DISCOVERY_URL).json()
-    
-    auth_url = (
-        f"{google_provider_cfg['authorization_endpoint']}?"
-        f"client_id={GOOGLE_CLIENT_ID}&"
-        "response_type=code&"
-        "scope=openid%20email%20profile&"
-        f"redirect_uri=http://localhost:5000/auth/google/callback&"
-        "access_type=offline"
-    )
+    try:
+        auth_url = oauth_client.authorization_url()
+    except OAuthError as e:
+        return f"Error during authentication: {str(e)}", 503
     return redirect(auth_url)
 
 @app.route('/auth/google/callback')
@@ -241,31 +663,8 @@ def google_auth_callback():
     if not code:
         return "Error: No code provided", 400
     try:
-        google_provider_cfg = requests.get(GOOGLE_DISCOVERY_URL).json()
-        token_endpoint = google_provider_cfg["token_endpoint"]
-        token_data = {
-            'code': code,
-            'client_id': GOOGLE_CLIENT_ID,
-            'client_secret': GOOGLE_CLIENT_SECRET,
-            'redirect_uri': 'http://localhost:5000/auth/google/callback',
-            'grant_type': 'authorization_code',
-        }
-        token_response = requests.post(
-            token_endpoint,
-            data=token_data,
-            headers={'Content-Type': 'application/x-www-form-urlencoded'}
-        )
-        if token_response.status_code != 200:
-            return f"Error getting tokens: {token_response.text}", 400
-        tokens = token_response.json()
-        userinfo_endpoint = google_provider_cfg["userinfo_endpoint"]
-        userinfo_response = requests.get(
-            userinfo_endpoint,
-            headers={"Authorization": f"Bearer {tokens['access_token']}"}
-        )
-        if userinfo_response.status_code != 200:
-            return f"Error getting user info: {userinfo_response.text}", 400
-        userinfo = userinfo_response.json()
+        tokens = oauth_client.exchange_code(code)
+        userinfo = oauth_client.userinfo(tokens['access_token'])
         
         session['user'] = {
             'id': userinfo['sub'],
@@ -276,9 +675,9 @@ def google_auth_callback():
         
         session['is_admin'] = userinfo.get('email') in ADMIN_EMAILS
     
-        if userinfo['sub'] not in chat_sessions:
-            chat_sessions[userinfo['sub']] = ChatSession(userinfo['sub'])
         return redirect(url_for('index'))
+    except OAuthError as e:
+        return str(e), 400
     except Exception as e:
         return f"Error during authentication: {str(e)}", 500
 
@@ -288,6 +687,323 @@ def logout():
     session.pop('is_admin', None)
     return redirect(url_for('login'))
 
+router = IntentRouter()
+
+@router.intent('add_product', r"add product\s*:\s*name=(.*?),\s*description=(.*?),\s*category=(.*?),\s*price=([\d.]+),\s*stock=(\d+),\s*is_active=(\d)")
+def add_product_intent(groups, user_id, language):
+    name = groups[0].strip()
+    description = groups[1].strip()
+    category = groups[2].strip()
+    price = float(groups[3].strip())
+    stock = int(groups[4].strip())
+    is_active = int(groups[5].strip())
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO product_catalog (name, description, category, price, stock, is_active)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                """,
+                (name, description, category, price, stock, is_active)
+            )
+            conn.commit()
+            cursor.close()
+        catalog_cache.invalidate()
+        return f"Product '{name}' added successfully to the catalog.", False
+    except Exception as db_err:
+        return f"Failed to add product: {db_err}", False
+
+@router.intent('search_products', r"search products?\s*:(.*)")
+def search_products_intent(groups, user_id, language):
+    command = groups[0].strip()
+    try:
+        filters = parse_search_command(command)
+        with get_db_connection() as conn:
+            rows, next_cursor = search_products(conn, **filters)
+        return render_search_results(rows, next_cursor, command), False
+    except ValueError:
+        return "Usage: search products: <keywords>, category=<name>, min_price=<n>, max_price=<n>", False
+    except Exception as db_err:
+        return f"Failed to search products: {db_err}", False
+
+@router.intent('show_products', r"\b(?:product show|show products|list products|display products)\b")
+def show_products_intent(groups, user_id, language):
+    try:
+        try:
+            return catalog_cache.render(language, render_product_listing), True
+        except Exception as render_err:
+            if language == 'en':
+                raise
+            print(f"Translated product listing failed: {render_err}")
+            chat_fallbacks.inc(reason='listing_untranslated')
+            return catalog_cache.render('en', render_product_listing), False
+    except Exception as db_err:
+        return f"Failed to fetch products: {db_err}", False
+
+@router.intent('add_to_cart', r"add to cart\s*:\s*(?:pid|product_id)\s*=\s*(\d+)\s*,\s*(?:q|quantity)\s*=\s*(\d+)")
+def add_to_cart_intent(groups, user_id, language):
+    product_id = int(groups[0])
+    quantity = int(groups[1])
+    if quantity < 1:
+        return "Quantity must be at least 1.", False
+    try:
+        cart = cart_service.add(user_id, product_id, quantity)
+    except UnknownProductError as e:
+        return str(e), False
+    except Exception as db_err:
+        return f"Failed to add to cart: {db_err}", False
+    line = cart.lines[product_id]
+    return (f"Added {line['name']} (qty: {quantity}) to your cart. "
+            f"You now have {line['quantity']}. Cart total: ${cart.total:.2f}"), False
+
+@router.intent('view_cart', r"\b(?:(?:view|show|display) (?:my )?cart|what'?s in my cart)\b")
+def view_cart_intent(groups, user_id, language):
+    try:
+        cart = cart_service.get(user_id)
+    except Exception as db_err:
+        return f"Failed to fetch your cart: {db_err}", False
+    if not cart.lines:
+        return "Your cart is empty.", False
+    lines = ["Your cart:"]
+    lines.extend(
+        f"- ID: {line['product_id']}, {line['name']} x {line['quantity']} | ${line['line_total']:.2f}"
+        for line in cart.lines.values()
+    )
+    lines.append(f"Total: ${cart.total:.2f}")
+    return "\n".join(lines), False
+
+@router.intent('order_status', r"\b(?:order status|my orders|track (?:my )?order)\b(?:\s*#?\s*(\d+))?")
+def order_status_intent(groups, user_id, language):
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            if groups[0]:
+                cursor.execute(
+                    "SELECT id, order_details, placed_at FROM orders WHERE user_id=%s AND id=%s",
+                    (user_id, int(groups[0]))
+                )
+            else:
+                cursor.execute(
+                    "SELECT id, order_details, placed_at FROM orders WHERE user_id=%s ORDER BY placed_at DESC LIMIT 5",
+                    (user_id,)
+                )
+            orders = cursor.fetchall()
+            cursor.close()
+    except Exception as db_err:
+        return f"Failed to fetch your orders: {db_err}", False
+    if not orders:
+        return "No orders found.", False
+    lines = ["Your orders:"]
+    lines.extend(
+        f"- Order #{order[0]} placed {order[2].strftime('%Y-%m-%d %H:%M') if order[2] else ''}: {order[1]}"
+        for order in orders
+    )
+    return "\n".join(lines), False
+
+@router.intent('product_lookup', r"\b(?:product|item)\s*(?:id\s*)?#?\s*(\d+)\b")
+def product_lookup_intent(groups, user_id, language):
+    product_id = int(groups[0])
+    try:
+        p = catalog_cache.get_product(product_id)
+    except Exception as db_err:
+        return f"Failed to fetch product: {db_err}", False
+    if p is None:
+        return f"Product {product_id} is not available.", False
+    return f"ID: {p[0]}, {p[1]} ({p[3]}): {p[2]} | Price: ${p[4]:.2f} | Stock: {p[5]}", False
+
+RECOMMENDATIONS_LOADING_REPLY = "Recommendations are still loading. Please ask again in a moment."
+
+def recommendations_loading():
+    # The first build scans all of order_items; it runs in the background, never on a request.
+    if copurchase_index.ready:
+        return False
+    copurchase_index.warm()
+    return True
+
+# Only explicit command forms: phrases like "goes well with" are ordinary questions for Gemini.
+@router.intent('also_bought', r"(?:\balso bought\s*:|\b(?:people|customers) who bought\b)\s*(.*)")
+def also_bought_intent(groups, user_id, language):
+    reference = re.sub(r"\balso (?:bought|buy|get)\b.*$|\b(?:product|item)\s*(?:id\s*)?#?", '', groups[0], flags=re.IGNORECASE)
+    reference = reference.strip(' ?.!#')
+    if not reference:
+        return "Usage: also bought: <product id or name>", False
+    if recommendations_loading():
+        return RECOMMENDATIONS_LOADING_REPLY, False
+    try:
+        product = find_product(reference)
+        if product is None:
+            return f"I couldn't find a product matching '{reference}'.", False
+        scored = copurchase_index.also_bought(product[0], limit=RECOMMEND_LIMIT * 3)
+        products = available_recommendations(scored)
+    except Exception as db_err:
+        return f"Failed to load recommendations: {db_err}", False
+    return render_recommendations(f"People who bought {product[1]} also bought:", products), False
+
+@router.intent('complete_basket', r"\b(?:complete my (?:basket|cart)|what else should i (?:buy|get)|recommend(?:ations)? for my cart)\b")
+def complete_basket_intent(groups, user_id, language):
+    if recommendations_loading():
+        return RECOMMENDATIONS_LOADING_REPLY, False
+    try:
+        cart = cart_service.get(user_id)
+        if not cart.lines:
+            return "Your cart is empty. Add a few products and I can suggest what goes with them.", False
+        scored = copurchase_index.complete_basket(cart.lines, limit=RECOMMEND_LIMIT * 3)
+        products = available_recommendations(scored)
+    except Exception as db_err:
+        return f"Failed to load recommendations: {db_err}", False
+    return render_recommendations("Shoppers with a cart like yours also bought:", products), False
+
+@router.intent('order_messages', r"\b(?:message order|order messages?)\s*#?\s*(\d+)\s*(?::\s*(.+))?")
+def order_messages_intent(groups, user_id, language):
+    order_id = int(groups[0])
+    try:
+        if groups[1]:
+            post_order_message(order_id, user_id, False, groups[1])
+            return f"Your message about order #{order_id} was sent to the store.", False
+        with get_db_connection() as conn:
+            if order_owner(conn, order_id) != user_id:
+                raise OrderNotFoundError(f"Order {order_id} not found")
+            messages = list_messages(conn, order_id)
+    except (OrderNotFoundError, ValueError) as e:
+        return str(e), False
+    except Exception as db_err:
+        return f"Failed to load order messages: {db_err}", False
+    if not messages:
+        return f"No messages for order #{order_id} yet.", False
+    lines = [f"Messages for order #{order_id}:"]
+    lines.extend(
+        f"- {m['sent_at']} {'You' if m['sender'] == 'user' else 'Store'}: {m['message']}" for m in messages
+    )
+    return "\n".join(lines), False
+
+@router.intent('place_order', r"place order")
+def place_order_intent(groups, user_id, language):
+    try:
+        with get_db_connection() as conn:
+            order = place_order(conn, user_id)
+    except EmptyCartError:
+        cart_service.clear(user_id)
+        return "Your cart is empty. Add products before placing an order.", False
+    except Exception as db_err:
+        return f"Failed to place order: {db_err}", False
+    after_order_placed(user_id, order)
+    return f"Order #{order['order_id']} placed successfully! Total: ${order['total']:.2f}. Your cart is now empty.", False
+
+def after_order_placed(user_id, order):
+    # The order is committed by now: a failing side effect is logged, never reported as a failed order.
+    cart_service.clear(user_id)
+    catalog_cache.invalidate()
+    try:
+        copurchase_index.record_order(order['order_id'], [item['product_id'] for item in order['items']])
+    except Exception as e:
+        print(f"Recording order {order['order_id']} for recommendations failed: {e}")
+    try:
+        publish_order_placed(user_id, order)
+    except Exception as e:
+        print(f"Publishing order {order['order_id']} failed: {e}")
+
+def publish_order_placed(user_id, order):
+    # Shaped like an /admin/orders entry so the dashboard can render it directly.
+    items = []
+    for item in order['items']:
+        product = catalog_cache.get_product(item['product_id'])
+        items.append(dict(item, name=product[1] if product is not None else None))
+    event_hub.publish(['admin', user_channel(user_id)], 'order_placed', {
+        'id': order['order_id'],
+        'user_id': user_id,
+        'placed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'order_details': ", ".join(f"product_id={i['product_id']}, quantity={i['quantity']}" for i in items),
+        'items': items,
+        'total': round(order['total'], 2),
+    })
+
+def handle_command(message, user_id, current_language):
+    """Answer the deterministic chat commands locally.
+
+    Returns ``(response_text, translated)``, or ``None`` when the message is
+    not a command and should go to the AI model.
+    """
+    with stage('intent_match'):
+        matched = router.match(message)
+    if matched is None:
+        return None
+    if has_request_context() and 'stage_timer' in g:
+        g.stage_timer.intent = matched[0]
+    with stage('handler'):
+        return router.dispatch(matched, user_id=user_id, language=current_language)
+
+def stream_llm_reply(chat_session, message, user_id):
+    """Yield the model's reply in chunks, subject to admission control.
+
+    Raises ``AdmissionRejected`` or ``CircuitOpenError`` before any chunk
+    when the call is refused; callers answer with a canned reply instead.
+    """
+    if not llm_rate_limiter.allow(user_id):
+        raise RateLimited(f"rate limit exceeded for user {user_id}")
+    with llm_call():
+        yield from llm_runner.stream(chat_session.chat, message, timeout=LLM_TIMEOUT)
+
+def recommendation_context(user_id):
+    """A short note of co-purchase candidates for the user's cart, appended to LLM prompts.
+
+    Returns an empty string until the index is built; the build is started
+    in the background rather than on the request path.
+    """
+    if recommendations_loading():
+        return ''
+    try:
+        cart = cart_service.get(user_id)
+        if not cart.lines:
+            return ''
+        products = available_recommendations(copurchase_index.complete_basket(cart.lines, limit=RECOMMEND_LIMIT * 3))
+    except Exception as e:
+        print(f"Loading recommendations for the prompt failed: {e}")
+        return ''
+    if not products:
+        return ''
+    candidates = "; ".join(f"ID {p[0]}: {p[1]} (${p[4]:.2f})" for p in products)
+    return f"\n\n[Store context] Often bought with the items in this user's cart: {candidates}"
+
+def llm_prompt(chat_session, message, user_id):
+    """The prompt for an AI turn, and whether its answer may come from or go to the response cache.
+
+    Answers shaped by the user's cart or by earlier turns are never shared.
+    """
+    prompt = message + recommendation_context(user_id)
+    shareable = response_cache is not None and prompt == message and chat_session.is_standalone()
+    return prompt, shareable
+
+def degraded_reply(message, user_id, error):
+    print(f"AI call for user {user_id} not admitted: {error}")
+    if isinstance(error, RateLimited):
+        chat_fallbacks.inc(reason='rate_limited')
+        return RATE_LIMITED_REPLY
+    chat_fallbacks.inc(reason='circuit_open' if isinstance(error, CircuitOpenError) else 'admission_rejected')
+    return fallback_model.send_message(message).text
+
+def translate_response(response_text, current_language):
+    if current_language != 'en' and translation_service.available:
+        try:
+            with stage('translation'):
+                response_text = translation_service.translate(response_text, current_language)
+        except (AdmissionRejected, CircuitOpenError) as trans_err:
+            # Translation is degraded; an untranslated answer beats a slow one.
+            print(f"Translation skipped: {trans_err}")
+            chat_fallbacks.inc(reason='translation_skipped')
+        except Exception as trans_err:
+            chat_errors.inc(endpoint=request.endpoint if has_request_context() else '', kind='translation')
+            response_text += f"\n(Translation error: {trans_err})"
+    return response_text
+
+def record_bot_response(chat_session, response_text):
+    bot_message = chat_session.add_message('assistant', response_text)
+    print(f"Added bot response to history. Total messages: {len(chat_session.messages)}")
+
+    if len(chat_session.messages) > 20:
+        chat_session.messages = chat_session.messages[-20:]
+    return bot_message
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     if 'user' not in session:
@@ -298,169 +1014,304 @@ def chat():
     
     if not message:
         return jsonify({'error': 'No message provided'}), 400
+
+    since = data.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'since must be a message id'}), 400
     
     user_id = session['user']['id']
-    if user_id not in chat_sessions:
-        chat_sessions[user_id] = ChatSession(user_id)
-    
-    chat_session = chat_sessions[user_id]
+    timer = g.stage_timer = StageTimer()
+    with stage('session'):
+        chat_session = chat_store.get_or_create(user_id)
     
     try:
-        user_message = {
-            'role': 'user',
-            'text': message,
-            'timestamp': datetime.now().isoformat()
-        }
-        chat_session.messages.append(user_message)
+        user_message = chat_session.add_message('user', message)
 
         current_language = session.get('current_language', 'en')
 
-        add_product_pattern = r"add product\s*:\s*name=(.*?),\s*description=(.*?),\s*category=(.*?),\s*price=([\d.]+),\s*stock=(\d+),\s*is_active=(\d)"
-        match = re.search(add_product_pattern, message, re.IGNORECASE)
-        if match:
-            name = match.group(1).strip()
-            description = match.group(2).strip()
-            category = match.group(3).strip()
-            price = float(match.group(4).strip())
-            stock = int(match.group(5).strip())
-            is_active = int(match.group(6).strip())
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    INSERT INTO product_catalog (name, description, category, price, stock, is_active)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                    """,
-                    (name, description, category, price, stock, is_active)
-                )
-                conn.commit()
-                cursor.close()
-                conn.close()
-                response_text = f"Product '{name}' added successfully to the catalog."
-            except Exception as db_err:
-                response_text = f"Failed to add product: {db_err}"
-       
-        elif re.search(r"\b(product show|show products|list products|display products)\b", message, re.IGNORECASE):
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("SELECT id, name, description, category, price, stock FROM product_catalog WHERE is_active=1 AND stock > 0")
-                products = cursor.fetchall()
-                cursor.close()
-                conn.close()
-                if products:
-                    response_text = "Available products:\n"
-                    for p in products:
-                        response_text += f"- ID: {p[0]}, {p[1]} ({p[3]}): {p[2]} | Price: ${p[4]:.2f} | Stock: {p[5]}\n"
-                else:
-                    response_text = "No products available."
-            except Exception as db_err:
-                response_text = f"Failed to fetch products: {db_err}"
-        # Add to cart intent
-        elif re.search(r"add to cart\s*:\s*pid=(\d+),\s*q=(\d+)", message, re.IGNORECASE):
-            cart_match = re.search(r"add to cart\s*:\s*pid=(\d+),\s*q=(\d+)", message, re.IGNORECASE)
-            product_id = int(cart_match.group(1))
-            quantity = int(cart_match.group(2))
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute(
-                    "INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s)",
-                    (user_id, product_id, quantity)
-                )
-                conn.commit()
-                cursor.close()
-                conn.close()
-                response_text = f"Added product {product_id} (qty: {quantity}) to your cart."
-            except Exception as db_err:
-                response_text = f"Failed to add to cart: {db_err}"
-        
-        elif re.search(r"place order", message, re.IGNORECASE):
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("SELECT product_id, quantity FROM cart WHERE user_id=%s", (user_id,))
-                cart_items = cursor.fetchall()
-                if not cart_items:
-                    response_text = "Your cart is empty. Add products before placing an order."
-                else:
-                    
-                    for item in cart_items:
-                        cursor.execute(
-                            "UPDATE product_catalog SET stock = stock - %s WHERE id = %s AND stock >= %s",
-                            (item[1], item[0], item[1])
-                        )
-                        if cursor.rowcount == 0:
-                            raise Exception(f"Insufficient stock for product_id={item[0]}")
-                  
-                    order_details = ", ".join([f"product_id={item[0]}, quantity={item[1]}" for item in cart_items])
-                   
-                    cursor.execute(
-                        "INSERT INTO orders (user_id, order_details) VALUES (%s, %s)",
-                        (user_id, order_details)
-                    )
-                    
-                    cursor.execute("DELETE FROM cart WHERE user_id=%s", (user_id,))
-                    conn.commit()
-                    response_text = "Order placed successfully! Your cart is now empty."
-                cursor.close()
-                conn.close()
-            except Exception as db_err:
-                response_text = f"Failed to place order: {db_err}"
+        used_llm = False
+        shareable = False
+        prompt = message
+        command_result = handle_command(message, user_id, current_language)
+        if command_result is None:
+            prompt, shareable = llm_prompt(chat_session, message, user_id)
+        if command_result is not None:
+            response_text, translated = command_result
+        elif shareable and (cached := response_cache.get(message, current_language)) is not None:
+            timer.intent = 'response_cache'
+            response_text, translated = cached, True
         else:
-            response_text = ""
+            timer.intent = 'llm'
+            translated = False
             try:
-                response = chat_session.chat.send_message(message)
-                response_text = response.text if hasattr(response, 'text') else "I didn't get a proper response."
+                with stage('llm'):
+                    response_text = ''.join(stream_llm_reply(chat_session, prompt, user_id))
+                if not response_text:
+                    chat_fallbacks.inc(reason='empty_response')
+                    response_text = "I didn't get a proper response."
+                else:
+                    used_llm = True
+            except (AdmissionRejected, CircuitOpenError) as e:
+                response_text = degraded_reply(message, user_id, e)
             except Exception as e:
+                print(f"AI response failed: {e}")
+                chat_errors.inc(endpoint='chat', kind='llm')
+                chat_fallbacks.inc(reason='llm_error')
                 response_text = "I'm having trouble connecting to the AI service right now. Please try again later."
 
-        if current_language != 'en' and translator:
-            try:
-                translated = translator.translate(response_text, dest=current_language)
-                response_text = translated.text
-            except Exception as trans_err:
-                response_text += f"\n(Translation error: {trans_err})"
-
-        bot_message = {
-            'role': 'assistant',
-            'text': response_text,
-            'timestamp': datetime.now().isoformat()
-        }
-        chat_session.messages.append(bot_message)
-        print(f"Added bot response to history. Total messages: {len(chat_session.messages)}")
+        if not translated:
+            response_text = translate_response(response_text, current_language)
+        if used_llm and shareable:
+            response_cache.put(message, current_language, response_text)
 
-        if len(chat_session.messages) > 20:
-            chat_session.messages = chat_session.messages[-20:]
+        bot_message = record_bot_response(chat_session, response_text)
+        with stage('session'):
+            chat_store.save(chat_session)
 
         response_data = {
-            'message': {
-                'role': 'assistant',
-                'text': response_text,
-                'timestamp': datetime.now().isoformat()
-            },
-            'history': chat_session.messages,
+            'message': bot_message,
+            'messages': chat_session.messages_since(since) if since is not None else [user_message, bot_message],
+            'last_id': chat_session.last_message_id,
             'cart': chat_session.cart,
             'status': 'success'
         }
-        return jsonify(response_data)
+        with stage('serialize'):
+            response = jsonify(response_data)
+        if used_llm:
+            response.call_on_close(chat_session.compact_context)
+        record_chat_metrics('chat', timer)
+        return response
 
     except Exception as e:
         import traceback
         traceback.print_exc()
+        chat_errors.inc(endpoint='chat', kind='unhandled')
+        record_chat_metrics('chat', timer)
         return jsonify({'error': str(e)}), 500
 
+def sse_event(payload):
+    return f"data: {json.dumps(payload)}\n\n"
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    data = request.json
+    message = data.get('message')
+
+    if not message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    user_id = session['user']['id']
+    timer = g.stage_timer = StageTimer()
+    with stage('session'):
+        chat_session = chat_store.get_or_create(user_id)
+    current_language = session.get('current_language', 'en')
+    user_message = chat_session.add_message('user', message)
+
+    def generate():
+        used_llm = False
+        shareable = False
+        prompt = message
+        command_result = handle_command(message, user_id, current_language)
+        if command_result is None:
+            prompt, shareable = llm_prompt(chat_session, message, user_id)
+        if command_result is not None:
+            response_text, translated = command_result
+        elif shareable and (cached := response_cache.get(message, current_language)) is not None:
+            timer.intent = 'response_cache'
+            response_text, translated = cached, True
+        else:
+            timer.intent = 'llm'
+            translated = False
+            parts = []
+            try:
+                # Includes the time spent handing chunks to the client.
+                with stage('llm'):
+                    for chunk in stream_llm_reply(chat_session, prompt, user_id):
+                        parts.append(chunk)
+                        # Non-English replies are translated as a whole once complete.
+                        if current_language == 'en':
+                            yield sse_event({'type': 'chunk', 'text': chunk})
+                if not parts:
+                    chat_fallbacks.inc(reason='empty_response')
+                response_text = ''.join(parts) or "I didn't get a proper response."
+                used_llm = bool(parts)
+            except (AdmissionRejected, CircuitOpenError) as e:
+                response_text = degraded_reply(message, user_id, e)
+            except Exception as e:
+                print(f"Streaming AI response failed: {e}")
+                chat_errors.inc(endpoint='chat_stream', kind='llm')
+                chat_fallbacks.inc(reason='llm_error')
+                response_text = ''.join(parts) or "I'm having trouble connecting to the AI service right now. Please try again later."
+
+        if not translated:
+            response_text = translate_response(response_text, current_language)
+        if used_llm and shareable:
+            response_cache.put(message, current_language, response_text)
+
+        bot_message = record_bot_response(chat_session, response_text)
+        with stage('session'):
+            chat_store.save(chat_session)
+        with stage('serialize'):
+            done = sse_event({
+                'type': 'done',
+                'message': bot_message,
+                'user_message_id': user_message['id'],
+                'last_id': chat_session.last_message_id,
+                'cart': chat_session.cart,
+                'order_thread': timer.intent == 'order_messages'
+            })
+        record_chat_metrics('chat_stream', timer)
+        yield done
+        if used_llm:
+            chat_session.compact_context()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/chat/history', methods=['GET'])
 def get_chat_history():
     if 'user' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
+    since = request.args.get('since', type=int)
     user_id = session['user']['id']
-    if user_id not in chat_sessions:
-        return jsonify({'messages': []})
-    
-    return jsonify({'messages': chat_sessions[user_id].messages})
+    # A session evicted from memory (or lost to a restart) is rebuilt from the saved transcript.
+    with stage('session'):
+        chat_session = chat_store.get_or_create(user_id)
+
+    # The user and the newest id identify the history state, so unchanged polls are answered with 304.
+    user_tag = hashlib.sha256(str(user_id).encode()).hexdigest()[:16]
+    etag = f"{user_tag}-{chat_session.last_message_id}-{since if since is not None else 'all'}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify({
+            'messages': chat_session.messages_since(since),
+            'last_id': chat_session.last_message_id
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+@app.route('/api/events', methods=['GET'])
+def event_stream():
+    # Holds a worker for the life of the stream, so only the admin dashboard gets one;
+    # chat pages use /api/events/poll.
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Forbidden'}), 403
+    channels = ['admin', user_channel(session['user']['id'])]
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    subscription = event_hub.subscribe(channels, last_event_id)
+
+    def generate():
+        # Streams are closed after a while; EventSource reconnects with Last-Event-ID
+        # and resumes, so a dead client never holds a worker for long.
+        deadline = time.monotonic() + EVENTS_MAX_STREAM_SECONDS
+        try:
+            yield "retry: 3000\n\n"
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=EVENTS_HEARTBEAT)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                event_id = f"id: {event['id']}\n" if event['id'] is not None else ''
+                yield f"{event_id}event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            subscription.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/events/poll', methods=['GET'])
+def poll_events():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    after = request.args.get('after', type=int)
+    if after is None:
+        # First call: just hand out the position to wait from.
+        return jsonify({'events': [], 'last_id': event_hub.last_event_id})
+    events = event_hub.poll([user_channel(session['user']['id'])], after, EVENTS_POLL_WAIT)
+    ids = [event['id'] for event in events if event['id'] is not None]
+    if len(ids) < len(events):
+        # Resync: the missed events are gone, so start over from the newest one.
+        ids.append(event_hub.last_event_id)
+    return jsonify({
+        'events': [{'id': e['id'], 'type': e['type'], 'data': e['data']} for e in events],
+        'last_id': max(ids) if ids else after
+    })
+
+@app.route('/api/orders/<int:order_id>/messages', methods=['GET'])
+def get_order_messages(order_id):
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    after = request.args.get('after', type=int)
+    try:
+        with get_db_connection() as conn:
+            if order_owner(conn, order_id) != session['user']['id'] and not session.get('is_admin'):
+                raise OrderNotFoundError(f"Order {order_id} not found")
+            messages = list_messages(conn, order_id, after_id=after)
+    except OrderNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'messages': messages, 'last_id': messages[-1]['id'] if messages else after})
+
+@app.route('/api/orders/<int:order_id>/messages', methods=['POST'])
+def send_order_message(order_id):
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    data = request.json or {}
+    try:
+        message = post_order_message(order_id, session['user']['id'], session.get('is_admin', False), data.get('message'))
+    except OrderNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'success': True, 'message': message}), 201
+
+@app.route('/api/products', methods=['GET'])
+def list_products():
+    if 'user' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    try:
+        min_price = request.args.get('min_price', type=float)
+        max_price = request.args.get('max_price', type=float)
+        after_id = request.args.get('cursor', type=int)
+        limit = request.args.get('limit', 20, type=int)
+        with get_db_connection() as conn:
+            rows, next_cursor = search_products(
+                conn,
+                keyword=request.args.get('q'),
+                category=request.args.get('category'),
+                min_price=min_price,
+                max_price=max_price,
+                after_id=after_id,
+                limit=limit
+            )
+        return jsonify({
+            'products': [product_to_dict(row) for row in rows],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/language', methods=['POST'])
 def set_language():
@@ -484,24 +1335,23 @@ def admin_upload_excel():
         return jsonify({'error': 'No file uploaded'}), 400
     file = request.files['excel-file']
     filename = secure_filename(file.filename)
-    if not filename.endswith('.add to cart: product_id=2, quantity=3'):
+    if not filename.endswith('.xlsx'):
         return jsonify({'error': 'Only .xlsx files are supported'}), 400
+    mode = request.form.get('mode', 'replace')
+    if mode not in ('replace', 'upsert'):
+        return jsonify({'error': 'Invalid import mode'}), 400
     try:
-        df = pd.read_excel(file)
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SHOW COLUMNS FROM product_catalog")
-        db_columns = [col[0] for col in cursor.fetchall()]
-        df = df[[col for col in df.columns if col in db_columns]]
-        cursor.execute("DELETE FROM product_catalog")
-        for _, row in df.iterrows():
-            placeholders = ','.join(['%s'] * len(row))
-            sql = f"INSERT INTO product_catalog ({','.join(row.index)}) VALUES ({placeholders})"
-            cursor.execute(sql, tuple(row))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({'success': True, 'message': 'Products replaced successfully.'})
+        with get_db_connection() as conn:
+            report = import_catalog(conn, file, mode=mode)
+        catalog_cache.invalidate()
+        # Prices may have changed under every cached cart.
+        cart_service.invalidate()
+        message = 'Products replaced successfully.' if mode == 'replace' else 'Products merged successfully.'
+        return jsonify({'success': True, 'message': message, 'report': report})
+    except ImportRejected as e:
+        return jsonify({'error': str(e), 'report': e.report}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -510,23 +1360,118 @@ def admin_get_orders():
     if not session.get('is_admin'):
         return jsonify({'error': 'Not authorized'}), 403
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, user_id, order_details, placed_at FROM orders ORDER BY placed_at DESC")
-        orders = [
-            {
-                'id': row[0],
-                'user_id': row[1],
-                'order_details': row[2],
-                'placed_at': row[3].strftime('%Y-%m-%d %H:%M:%S') if row[3] else ''
-            }
-            for row in cursor.fetchall()
-        ]
-        cursor.close()
-        conn.close()
-        return jsonify({'orders': orders})
+        cursor = request.args.get('cursor')
+        user_id = request.args.get('user_id')
+        date_from = parse_date(request.args.get('from'))
+        date_to = parse_date(request.args.get('to'))
+        limit = request.args.get('limit', 50, type=int)
+    except ValueError:
+        return jsonify({'error': 'Invalid filter'}), 400
+    try:
+        with get_db_connection() as conn:
+            orders, next_cursor = list_orders(conn, cursor=cursor, user_id=user_id,
+                                              date_from=date_from, date_to=date_to, limit=limit)
+        return jsonify({'orders': orders, 'next_cursor': next_cursor})
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+ORDER_STATS = {
+    'revenue': revenue_per_day,
+    'top_products': top_products,
+    'categories': units_per_category,
+}
+
+@app.route('/admin/stats/<name>', methods=['GET'])
+def admin_order_stats(name):
+    if not session.get('is_admin'):
+        return jsonify({'error': 'Not authorized'}), 403
+    if name not in ORDER_STATS:
+        return jsonify({'error': 'Unknown report'}), 404
+    try:
+        date_from = parse_date(request.args.get('from'))
+        date_to = parse_date(request.args.get('to'))
+    except ValueError:
+        return jsonify({'error': 'Invalid date'}), 400
+    try:
+        with get_db_connection() as conn:
+            rows = ORDER_STATS[name](conn, date_from=date_from, date_to=date_to)
+        return jsonify({'report': name, 'rows': rows})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/metrics/db', methods=['GET'])
+def db_pool_metrics():
+    return jsonify(db_pool.stats())
+
+@app.route('/api/metrics/sessions', methods=['GET'])
+def session_store_metrics():
+    return jsonify(chat_store.stats())
+
+@app.route('/api/metrics/translation', methods=['GET'])
+def translation_cache_metrics():
+    return jsonify(translation_service.cache.stats())
+
+@app.route('/api/metrics/intents', methods=['GET'])
+def intent_router_metrics():
+    return jsonify(router.stats())
+
+@app.route('/api/metrics/transcript', methods=['GET'])
+def transcript_metrics():
+    return jsonify(transcript_store.stats())
+
+@app.route('/api/metrics/response_cache', methods=['GET'])
+def response_cache_metrics():
+    if response_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(response_cache.stats(), enabled=True))
+
+def admission_stats():
+    return {
+        'llm_gate': llm_gate.stats(),
+        'llm_rate_limiter': llm_rate_limiter.stats(),
+        'llm_breaker': llm_breaker.stats(),
+        'translation_gate': translation_gate.stats(),
+        'translation_breaker': translation_breaker.stats(),
+    }
+
+@app.route('/api/metrics/admission', methods=['GET'])
+def admission_metrics():
+    return jsonify(admission_stats())
+
+@app.route('/api/metrics/catalog', methods=['GET'])
+def catalog_cache_metrics():
+    return jsonify(catalog_cache.stats())
+
+@app.route('/api/metrics/cart', methods=['GET'])
+def cart_metrics():
+    return jsonify(cart_service.stats())
+
+@app.route('/api/metrics/recommendations', methods=['GET'])
+def recommendation_metrics():
+    return jsonify(copurchase_index.stats())
+
+@app.route('/api/metrics/events', methods=['GET'])
+def event_hub_metrics():
+    return jsonify(event_hub.stats())
+
+# The existing stats() snapshots, exported as gauges next to the chat metrics.
+metrics.add_stats('db_pool', lambda: db_pool.stats())
+metrics.add_stats('sessions', lambda: chat_store.stats())
+metrics.add_stats('catalog_cache', lambda: catalog_cache.stats())
+metrics.add_stats('cart', lambda: cart_service.stats())
+metrics.add_stats('recommendations', lambda: copurchase_index.stats())
+metrics.add_stats('events', lambda: event_hub.stats())
+metrics.add_stats('translation_cache', lambda: translation_service.cache.stats())
+metrics.add_stats('transcript', lambda: transcript_store.stats())
+metrics.add_stats('response_cache', lambda: response_cache.stats() if response_cache else None)
+metrics.add_stats('admission', admission_stats)
+metrics.add_stats('oauth_discovery', oauth_client.discovery.stats)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""A local stand-in for Google's OpenID Connect endpoints.
+
+Serves the discovery document (with ``Cache-Control: max-age``), an
+authorization endpoint that redirects straight back with a code, and the token
+and userinfo endpoints. Point the app at it with
+
+    GOOGLE_DISCOVERY_URL=http://localhost:5001/.well-known/openid-configuration
+
+or measure a login spike end to end:
+
+    python -m bench.fake_idp --logins 500 --concurrency 32
+"""
+import os
+import json
+import time
+import secrets
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+
+class FakeIdentityProvider(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, max_age=3600, latency=0.0):
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.max_age = max_age
+        self.latency = latency
+        self._codes = {}
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.connections = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def discovery_url(self):
+        return f"{self.base_url}/.well-known/openid-configuration"
+
+    def issue_code(self, login_hint):
+        code = secrets.token_urlsafe(16)
+        with self._lock:
+            self._codes[code] = login_hint or f"user-{len(self._codes)}"
+        return code
+
+    def redeem_code(self, code):
+        with self._lock:
+            subject = self._codes.pop(code, None)
+            if subject is None:
+                return None
+            token = secrets.token_urlsafe(24)
+            self._tokens[token] = subject
+            return token
+
+    def subject_for(self, token):
+        with self._lock:
+            return self._tokens.get(token)
+
+    def count(self, path):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='fake-idp', daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.count(url.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if url.path == '/.well-known/openid-configuration':
+            base = self.server.base_url
+            self._send_json(200, {
+                'issuer': base,
+                'authorization_endpoint': f"{base}/authorize",
+                'token_endpoint': f"{base}/token",
+                'userinfo_endpoint': f"{base}/userinfo",
+            }, {'Cache-Control': f"public, max-age={self.server.max_age}"})
+        elif url.path == '/authorize':
+            query = parse_qs(url.query)
+            code = self.server.issue_code(query.get('login_hint', [''])[0])
+            redirect_uri = query.get('redirect_uri', [''])[0]
+            self.send_response(302)
+            self.send_header('Location', f"{redirect_uri}?{urlencode({'code': code})}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif url.path == '/userinfo':
+            token = self.headers.get('Authorization', '').removeprefix('Bearer ')
+            subject = self.server.subject_for(token)
+            if subject is None:
+                self._send_json(401, {'error': 'invalid_token'})
+                return
+            self._send_json(200, {
+                'sub': subject,
+                'name': subject.replace('-', ' ').title(),
+                'email': f"{subject}@example.com",
+                'picture': '',
+            })
+        else:
+            self._send_json(404, {'error': 'not_found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.server.count(url.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        if url.path != '/token':
+            self._send_json(404, {'error': 'not_found'})
+            return
+        token = self.server.redeem_code(form.get('code', [''])[0])
+        if token is None:
+            self._send_json(400, {'error': 'invalid_grant'})
+            return
+        self._send_json(200, {'access_token': token, 'token_type': 'Bearer', 'expires_in': 3600})
+
+
+def run_logins(idp, logins, concurrency):
+    """Drive /auth/google and its callback through the app; returns latencies."""
+    os.environ['GOOGLE_DISCOVERY_URL'] = idp.discovery_url
+    os.environ.setdefault('TRANSLATION_PREWARM', '0')
+    import app as grocery_app
+
+    def login(number):
+        client = grocery_app.app.test_client()
+        started = time.perf_counter()
+        authorize = client.get('/auth/google').headers['Location']
+        authorize += '&' + urlencode({'login_hint': f"bench-user-{number}"})
+        with grocery_app.oauth_client.http.get(authorize, allow_redirects=False, timeout=10) as response:
+            callback = urlparse(response.headers['Location'])
+        result = client.get(f"{callback.path}?{callback.query}")
+        elapsed = time.perf_counter() - started
+        if result.status_code != 302:
+            raise RuntimeError(f"login {number} failed: {result.status_code} {result.get_data(as_text=True)}")
+        return elapsed
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(login, range(logins))), grocery_app.oauth_client.discovery.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--max-age', type=int, default=3600, help="Cache-Control max-age of the discovery document")
+    parser.add_argument('--latency', type=float, default=0.0, help="added to every IdP response, seconds")
+    parser.add_argument('--logins', type=int, default=0, help="run this many logins through the app, then exit")
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    idp = FakeIdentityProvider(args.port, max_age=args.max_age, latency=args.latency)
+    if not args.logins:
+        print(f"Fake identity provider on {idp.discovery_url}")
+        idp.serve_forever()
+        return
+
+    idp.start()
+    started = time.perf_counter()
+    latencies, discovery = run_logins(idp, args.logins, args.concurrency)
+    wall = time.perf_counter() - started
+    latencies.sort()
+    print(f"{args.logins} logins in {wall:.2f}s ({args.logins / wall:.1f}/s)  "
+          f"p50={latencies[len(latencies) // 2] * 1000:.1f}ms  p99={latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
+    print(f"IdP requests: {idp.requests}  TCP connections: {idp.connections}")
+    print(f"Discovery cache: {discovery}")
+    idp.shutdown()
+
+
+if __name__ == '__main__':
+    main()
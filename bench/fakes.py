@@ -0,0 +1,193 @@
+"""Local stand-ins for Gemini and MySQL used by the benchmark harness."""
+import re
+import time
+import asyncio
+import sqlite3
+
+from db import ConnectionPool, _PooledConnection
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeStream:
+    def __init__(self, chunks, chunk_latency):
+        self._chunks = chunks
+        self._chunk_latency = chunk_latency
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            await asyncio.sleep(self._chunk_latency)
+            yield FakeResponse(chunk)
+
+
+class FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history or [])
+
+    def _reply(self, message):
+        self.model.calls += 1
+        self.history.append({'role': 'user', 'parts': [message]})
+        text = self.model.reply(message)
+        self.history.append({'role': 'model', 'parts': [text]})
+        return text
+
+    def send_message(self, message, **kwargs):
+        time.sleep(self.model.latency)
+        return FakeResponse(self._reply(message))
+
+    async def send_message_async(self, message, stream=False, **kwargs):
+        await asyncio.sleep(self.model.latency)
+        text = self._reply(message)
+        if not stream:
+            return FakeResponse(text)
+        words = text.split(' ')
+        chunks = [' '.join(words[i:i + 8]) + ' ' for i in range(0, len(words), 8)]
+        return _FakeStream(chunks, self.model.chunk_latency)
+
+
+class FakeModel:
+    """Deterministic replacement for ``genai.GenerativeModel``.
+
+    ``latency`` is the time to first token and ``chunk_latency`` the gap
+    between streamed chunks, so upstream slowness can be dialled in.
+    """
+
+    def __init__(self, latency=0.2, chunk_latency=0.01, reply_words=60):
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.reply_words = reply_words
+        self.calls = 0
+
+    def reply(self, message):
+        words = f"Here is a helpful grocery answer about {message[:40]}.".split()
+        return ' '.join((words * (self.reply_words // len(words) + 1))[:self.reply_words])
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history)
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self.latency)
+        return FakeResponse("The user is shopping for groceries and asked several cooking questions.")
+
+
+_SHOW_COLUMNS = re.compile(r"^\s*SHOW COLUMNS FROM (\w+)\s*$", re.IGNORECASE)
+_FULLTEXT = re.compile(r"MATCH\((\w+),\s*(\w+)\)\s+AGAINST\s*\(%s IN BOOLEAN MODE\)", re.IGNORECASE)
+_ON_DUPLICATE = re.compile(r"ON DUPLICATE KEY UPDATE", re.IGNORECASE)
+_VALUES_REF = re.compile(r"VALUES\((`?\w+`?)\)", re.IGNORECASE)
+
+
+def translate_sql(sql):
+    """Rewrite the MySQL dialect used by the app into SQLite."""
+    sql = _FULLTEXT.sub(r"bench_fulltext(%s, \1, \2)", sql)
+    sql = re.sub(r"\bFOR UPDATE\b", "", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bINSERT IGNORE\b", "INSERT OR IGNORE", sql, flags=re.IGNORECASE)
+    duplicate = _ON_DUPLICATE.search(sql)
+    if duplicate:
+        updates = _VALUES_REF.sub(r"excluded.\1", sql[duplicate.end():])
+        sql = sql[:duplicate.start()] + "ON CONFLICT DO UPDATE SET" + updates
+    return sql.replace('%s', '?')
+
+
+def _fulltext(query, *columns):
+    # BOOLEAN MODE as the app uses it: every +word* must prefix-match some word.
+    words = re.findall(r"\w+", ' '.join(column or '' for column in columns).lower())
+    terms = [term.strip('+*').lower() for term in (query or '').split()]
+    return int(all(any(word.startswith(term) for word in words) for term in terms if term))
+
+
+class SQLiteCursor:
+    def __init__(self, raw):
+        self._cursor = raw.cursor()
+        self._rows = None
+
+    def execute(self, sql, params=()):
+        self._rows = None
+        show = _SHOW_COLUMNS.match(sql)
+        if show:
+            self._cursor.execute(f"PRAGMA table_info({show.group(1)})")
+            self._rows = [(row[1], row[2], 'YES' if not row[3] else 'NO', 'PRI' if row[5] else '', row[4], '')
+                          for row in self._cursor.fetchall()]
+            return
+        self._cursor.execute(translate_sql(sql), tuple(params or ()))
+
+    def executemany(self, sql, seq_of_params):
+        self._rows = None
+        self._cursor.executemany(translate_sql(sql), [tuple(params) for params in seq_of_params])
+
+    def fetchall(self):
+        if self._rows is not None:
+            rows, self._rows = self._rows, []
+            return rows
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=1):
+        if self._rows is not None:
+            rows, self._rows = self._rows[:size], self._rows[size:]
+            return rows
+        return self._cursor.fetchmany(size)
+
+    def fetchone(self):
+        if self._rows is not None:
+            return self._rows.pop(0) if self._rows else None
+        return self._cursor.fetchone()
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Just enough of the mysql.connector connection API for the app."""
+
+    def __init__(self, path):
+        self._raw = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                                    detect_types=sqlite3.PARSE_DECLTYPES)
+        self._raw.execute("PRAGMA journal_mode=WAL")
+        self._raw.execute("PRAGMA synchronous=NORMAL")
+        self._raw.create_function('bench_fulltext', 3, _fulltext, deterministic=True)
+
+    def cursor(self):
+        return SQLiteCursor(self._raw)
+
+    def start_transaction(self):
+        # Take the write lock up front, as SELECT ... FOR UPDATE would.
+        self._raw.execute("BEGIN IMMEDIATE")
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def ping(self, reconnect=False):
+        self._raw.execute("SELECT 1")
+
+    def close(self):
+        self._raw.close()
+
+
+class SQLitePool(ConnectionPool):
+    def __init__(self, path, size=8):
+        super().__init__(size=size)
+        self.path = path
+
+    def _connect(self):
+        return _PooledConnection(SQLiteConnection(self.path))
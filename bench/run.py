@@ -0,0 +1,189 @@
+"""Throughput benchmark for the chat API.
+
+Boots ``app`` against local stand-ins: a SQLite database seeded with a
+synthetic catalog and order history instead of MySQL, a deterministic fake
+model with configurable latency instead of Gemini, and a pre-authenticated
+Flask session instead of Google OAuth. A weighted mix of chat messages is
+replayed at each concurrency level and p50/p99 latency and requests/sec are
+reported per intent.
+
+    python -m bench.run --products 20000 --orders 50000 --concurrency 1,8,32 --requests 500
+"""
+import os
+import sys
+import time
+import random
+import json
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Read by app at import time: no outbound translation, and the per-user LLM
+# limits opened up so the benchmark measures the app rather than the throttle.
+os.environ.setdefault('TRANSLATION_PREWARM', '0')
+os.environ.setdefault('LLM_USER_RATE', '1000')
+os.environ.setdefault('LLM_USER_BURST', '1000')
+os.environ.setdefault('LLM_MAX_WAITING', '1000')
+os.environ.setdefault('LLM_QUEUE_TIMEOUT', '60')
+
+from bench.fakes import FakeModel, SQLitePool
+from bench.seed import create_database
+
+FREE_FORM = [
+    "What can I cook with eggs and spinach?",
+    "How should I store fresh basil?",
+    "Suggest a cheap healthy breakfast for the week",
+    "Is oat milk a good substitute for cream in soup?",
+    "Plan three vegetarian dinners for two people",
+]
+
+# (intent, weight, message factory)
+MIX = [
+    ('show_products', 10, lambda rng, products: "show products"),
+    ('search_products', 15, lambda rng, products: f"search products: {rng.choice(['milk', 'organic rice', 'fresh', 'bread'])}"),
+    ('add_to_cart', 25, lambda rng, products: f"add to cart: pid={rng.randint(1, products)}, q={rng.randint(1, 3)}"),
+    ('view_cart', 15, lambda rng, products: "view cart"),
+    ('place_order', 10, lambda rng, products: "place order"),
+    ('free_form', 25, lambda rng, products: rng.choice(FREE_FORM)),
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def setup_app(db_path, pool_size, llm_latency, chunk_latency):
+    import app as grocery_app
+    grocery_app.db_pool = SQLitePool(db_path, size=pool_size)
+    grocery_app._model = FakeModel(latency=llm_latency, chunk_latency=chunk_latency)
+    grocery_app.translation_service.backend = None
+    grocery_app.app.config['TESTING'] = True
+    return grocery_app
+
+
+def make_client(grocery_app, user_number):
+    client = grocery_app.app.test_client()
+    with client.session_transaction() as fake_session:
+        fake_session['user'] = {
+            'id': f"bench-user-{user_number}",
+            'name': f"Bench User {user_number}",
+            'email': f"bench-user-{user_number}@example.com",
+        }
+        fake_session['is_admin'] = False
+        fake_session['current_language'] = 'en'
+    return client
+
+
+def run_level(grocery_app, concurrency, total, products, endpoint, seed):
+    rng = random.Random(seed)
+    weights = [weight for _, weight, _ in MIX]
+    work = []
+    for _ in range(total):
+        intent, _, make_message = rng.choices(MIX, weights=weights)[0]
+        work.append((intent, make_message(rng, products)))
+
+    local = threading.local()
+    users = iter(range(sys.maxsize))
+    users_lock = threading.Lock()
+    results = []
+    results_lock = threading.Lock()
+
+    def send(item):
+        intent, message = item
+        if not hasattr(local, 'client'):
+            with users_lock:
+                local.client = make_client(grocery_app, next(users))
+        started = time.perf_counter()
+        response = local.client.post(endpoint, json={'message': message})
+        response.get_data()  # drain streamed bodies too
+        elapsed = time.perf_counter() - started
+        failed = is_error(response)
+        with results_lock:
+            results.append((intent, elapsed, failed))
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, work))
+    return results, time.perf_counter() - wall_started
+
+
+# Handlers report failures as an ordinary 200 reply; these openings mark them.
+FAILED_REPLY_PREFIXES = ('Failed to', "I'm having trouble")
+
+
+def reply_text(response):
+    body = response.get_data(as_text=True)
+    if response.mimetype == 'text/event-stream':
+        events = [json.loads(line[6:]) for line in body.splitlines() if line.startswith('data: ')]
+        done = next((event for event in events if event.get('type') == 'done'), None)
+        return done['message']['text'] if done else ''
+    data = response.get_json(silent=True) or {}
+    return (data.get('message') or {}).get('text', '')
+
+
+def is_error(response):
+    if response.status_code >= 400:
+        return True
+    return reply_text(response).startswith(FAILED_REPLY_PREFIXES)
+
+
+def report(concurrency, results, wall):
+    print(f"\nconcurrency={concurrency}  requests={len(results)}  wall={wall:.2f}s  "
+          f"throughput={len(results) / wall:.1f} req/s")
+    print(f"{'intent':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    by_intent = {}
+    for intent, elapsed, failed in results:
+        by_intent.setdefault(intent, []).append((elapsed, failed))
+    for intent, _, _ in MIX:
+        samples = by_intent.get(intent)
+        if not samples:
+            continue
+        latencies = [elapsed for elapsed, _ in samples]
+        errors = sum(1 for _, failed in samples if failed)
+        print(f"{intent:<16}{len(samples):>7}{errors:>8}{percentile(latencies, 0.5) * 1000:>10.1f}"
+              f"{percentile(latencies, 0.99) * 1000:>10.1f}{len(samples) / wall:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--orders', type=int, default=50000)
+    parser.add_argument('--users', type=int, default=200, help="distinct users in the seeded order history")
+    parser.add_argument('--concurrency', default='1,4,16,32', help="comma separated client thread counts")
+    parser.add_argument('--requests', type=int, default=400, help="requests per concurrency level")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="fake model time to first token, seconds")
+    parser.add_argument('--chunk-latency', type=float, default=0.01, help="fake model gap between chunks, seconds")
+    parser.add_argument('--pool-size', type=int, default=8)
+    parser.add_argument('--stream', action='store_true', help="use /api/chat/stream instead of /api/chat")
+    parser.add_argument('--db', help="SQLite file to create (default: a temporary file)")
+    args = parser.parse_args()
+
+    workdir = None
+    db_path = args.db
+    if db_path is None:
+        workdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(workdir.name, 'bench.sqlite3')
+    elif os.path.exists(db_path):
+        sys.exit(f"{db_path} already exists")
+
+    started = time.perf_counter()
+    create_database(db_path, products=args.products, orders=args.orders, users=args.users)
+    print(f"Seeded {args.products} products and {args.orders} orders in {time.perf_counter() - started:.1f}s")
+
+    grocery_app = setup_app(db_path, args.pool_size, args.llm_latency, args.chunk_latency)
+    endpoint = '/api/chat/stream' if args.stream else '/api/chat'
+    try:
+        for level, concurrency in enumerate(int(c) for c in args.concurrency.split(',')):
+            results, wall = run_level(grocery_app, concurrency, args.requests, args.products, endpoint, seed=level)
+            report(concurrency, results, wall)
+    finally:
+        grocery_app.transcript_store.flush()
+        grocery_app.db_pool.close()
+        if workdir is not None:
+            workdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
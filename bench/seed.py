@@ -0,0 +1,121 @@
+"""Schema and synthetic data for the benchmark's SQLite stand-in."""
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+SCHEMA = """
+CREATE TABLE product_catalog (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT,
+    category TEXT,
+    price DECIMAL(10, 2) NOT NULL,
+    stock INTEGER NOT NULL,
+    is_active INTEGER DEFAULT 1
+);
+CREATE INDEX idx_product_catalog_category ON product_catalog (category);
+CREATE INDEX idx_product_catalog_active_stock ON product_catalog (is_active, stock);
+CREATE INDEX idx_product_catalog_price ON product_catalog (price);
+
+CREATE TABLE cart (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    UNIQUE (user_id, product_id)
+);
+
+CREATE TABLE orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    order_details TEXT,
+    placed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_orders_placed_at ON orders (placed_at, id);
+CREATE INDEX idx_orders_user_placed_at ON orders (user_id, placed_at, id);
+
+CREATE TABLE order_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    unit_price DECIMAL(10, 2) NOT NULL
+);
+CREATE INDEX idx_order_items_order_totals ON order_items (order_id, product_id, quantity, unit_price);
+CREATE INDEX idx_order_items_product ON order_items (product_id);
+
+CREATE TABLE order_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL REFERENCES orders(id),
+    sender TEXT NOT NULL,
+    message TEXT NOT NULL,
+    sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_order_messages_order_sent ON order_messages (order_id, sent_at);
+
+CREATE TABLE chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, message_id)
+);
+
+CREATE TABLE chat_summaries (
+    user_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+CATEGORIES = {
+    'Dairy': ['milk', 'yogurt', 'cheddar', 'butter', 'cream', 'mozzarella'],
+    'Produce': ['apple', 'banana', 'spinach', 'tomato', 'carrot', 'avocado', 'basil'],
+    'Bakery': ['bread', 'bagel', 'croissant', 'muffin', 'baguette'],
+    'Pantry': ['rice', 'pasta', 'flour', 'lentils', 'olive oil', 'honey', 'oats'],
+    'Meat': ['chicken', 'beef', 'salmon', 'turkey', 'shrimp'],
+    'Beverages': ['coffee', 'tea', 'orange juice', 'sparkling water', 'lemonade'],
+}
+ADJECTIVES = ['organic', 'fresh', 'whole', 'low fat', 'family size', 'premium', 'local', 'smoked', 'frozen']
+
+
+def product_rows(count, rng):
+    categories = list(CATEGORIES)
+    for i in range(count):
+        category = categories[i % len(categories)]
+        base = rng.choice(CATEGORIES[category])
+        name = f"{rng.choice(ADJECTIVES)} {base} {i}"
+        description = f"{rng.choice(ADJECTIVES).capitalize()} {base} from the {category.lower()} aisle"
+        yield (name, description, category, round(rng.uniform(0.5, 40), 2), rng.randint(500, 5000), 1)
+
+
+def create_database(path, products=20000, orders=50000, users=200, seed=42):
+    """Create a fresh database at ``path``; returns the number of products."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO product_catalog (name, description, category, price, stock, is_active) VALUES (?, ?, ?, ?, ?, ?)",
+        product_rows(products, rng)
+    )
+    prices = dict(conn.execute("SELECT id, price FROM product_catalog"))
+
+    started = datetime.now() - timedelta(days=365)
+    for order_id in range(1, orders + 1):
+        user_id = f"bench-user-{rng.randrange(users)}"
+        placed_at = started + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        lines = {rng.randint(1, products): rng.randint(1, 4) for _ in range(rng.randint(1, 6))}
+        details = ", ".join(f"product_id={pid}, quantity={qty}" for pid, qty in sorted(lines.items()))
+        conn.execute(
+            "INSERT INTO orders (id, user_id, order_details, placed_at) VALUES (?, ?, ?, ?)",
+            (order_id, user_id, details, placed_at.strftime('%Y-%m-%d %H:%M:%S'))
+        )
+        conn.executemany(
+            "INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (?, ?, ?, ?)",
+            [(order_id, pid, qty, prices[pid]) for pid, qty in lines.items()]
+        )
+    conn.commit()
+    conn.close()
+    return products
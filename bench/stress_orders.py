@@ -0,0 +1,161 @@
+"""Concurrency stress test for order placement.
+
+Many users race to buy the same few products. The run fails if any product is
+oversold or if the recorded order lines disagree with the stock that was taken.
+Point it at a disposable database; it creates and removes its own rows.
+
+    python -m bench.stress_orders --users 50 --orders-per-user 5 --stock 120
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from db import ConnectionPool
+from cart import add_items
+from order_service import place_order, InsufficientStockError
+
+USER_PREFIX = 'stress-user-'
+PRODUCT_NAME = 'stress-test product'
+
+
+def make_pool(size):
+    return ConnectionPool(
+        size=size,
+        host=os.getenv('MYSQL_HOST', 'localhost'),
+        user=os.getenv('MYSQL_USER', 'root'),
+        password=os.getenv('MYSQL_PASSWORD', ''),
+        database=os.getenv('MYSQL_DB', 'grocery_db'),
+    )
+
+
+def setup(pool, products, stock):
+    product_ids = []
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        for i in range(products):
+            cursor.execute(
+                "INSERT INTO product_catalog (name, description, category, price, stock, is_active) "
+                "VALUES (%s, %s, %s, %s, %s, 1)",
+                (PRODUCT_NAME, f"stress product {i}", 'stress', 1.50, stock)
+            )
+            product_ids.append(cursor.lastrowid)
+        conn.commit()
+        cursor.close()
+    return product_ids
+
+
+def cleanup(pool):
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE oi FROM order_items oi JOIN orders o ON o.id = oi.order_id WHERE o.user_id LIKE %s",
+            (USER_PREFIX + '%',)
+        )
+        cursor.execute("DELETE FROM orders WHERE user_id LIKE %s", (USER_PREFIX + '%',))
+        cursor.execute("DELETE FROM cart WHERE user_id LIKE %s", (USER_PREFIX + '%',))
+        cursor.execute("DELETE FROM product_catalog WHERE name = %s", (PRODUCT_NAME,))
+        conn.commit()
+        cursor.close()
+
+
+def run_user(pool, user_id, product_ids, orders, quantity, results, lock):
+    for n in range(orders):
+        # Every order touches all products, in a user-specific order, to provoke lock contention.
+        offset = hash((user_id, n)) % len(product_ids)
+        basket = product_ids[offset:] + product_ids[:offset]
+        started = time.perf_counter()
+        try:
+            with pool.connection() as conn:
+                add_items(conn, user_id, [(pid, quantity) for pid in basket])
+                place_order(conn, user_id)
+            outcome = 'placed'
+        except InsufficientStockError:
+            outcome = 'rejected'
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM cart WHERE user_id=%s", (user_id,))
+                conn.commit()
+                cursor.close()
+        except Exception as e:
+            outcome = 'failed'
+            print(f"{user_id}: {e}", file=sys.stderr)
+        with lock:
+            results[outcome] += 1
+            results['latencies'].append(time.perf_counter() - started)
+
+
+def verify(pool, product_ids, stock):
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT id, stock FROM product_catalog WHERE id IN ({placeholders})", tuple(product_ids))
+        remaining = dict(cursor.fetchall())
+        cursor.execute(
+            f"SELECT oi.product_id, SUM(oi.quantity) FROM order_items oi JOIN orders o ON o.id = oi.order_id "
+            f"WHERE o.user_id LIKE %s AND oi.product_id IN ({placeholders}) GROUP BY oi.product_id",
+            (USER_PREFIX + '%',) + tuple(product_ids)
+        )
+        sold = {pid: int(total) for pid, total in cursor.fetchall()}
+        cursor.close()
+
+    problems = []
+    for pid in product_ids:
+        if remaining[pid] < 0:
+            problems.append(f"product {pid} oversold: stock={remaining[pid]}")
+        if stock - remaining[pid] != sold.get(pid, 0):
+            problems.append(f"product {pid}: stock taken {stock - remaining[pid]} != units ordered {sold.get(pid, 0)}")
+    return remaining, sold, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--orders-per-user', type=int, default=5)
+    parser.add_argument('--products', type=int, default=3)
+    parser.add_argument('--stock', type=int, default=120)
+    parser.add_argument('--quantity', type=int, default=1)
+    parser.add_argument('--pool-size', type=int, default=16)
+    args = parser.parse_args()
+
+    load_dotenv()
+    pool = make_pool(args.pool_size)
+    cleanup(pool)
+    product_ids = setup(pool, args.products, args.stock)
+
+    results = {'placed': 0, 'rejected': 0, 'failed': 0, 'latencies': []}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.pool_size) as executor:
+            for i in range(args.users):
+                executor.submit(run_user, pool, f"{USER_PREFIX}{i}", product_ids,
+                                args.orders_per_user, args.quantity, results, lock)
+        elapsed = time.perf_counter() - started
+        remaining, sold, problems = verify(pool, product_ids, args.stock)
+    finally:
+        cleanup(pool)
+        pool.close()
+
+    latencies = sorted(results['latencies'])
+    attempts = len(latencies)
+    print(f"attempts: {attempts} in {elapsed:.2f}s ({attempts / elapsed:.1f} orders/s)")
+    print(f"placed: {results['placed']}  rejected (out of stock): {results['rejected']}  failed: {results['failed']}")
+    if latencies:
+        print(f"latency p50: {latencies[len(latencies) // 2] * 1000:.1f}ms  "
+              f"p99: {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.1f}ms")
+    print(f"remaining stock: {remaining}  units sold: {sold}")
+    print(f"pool: {pool.stats()}")
+    if problems or results['failed']:
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+    print("OK: no overselling")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import time
+import threading
+from collections import OrderedDict
+
+# Relies on the unique (user_id, product_id) key from cart_unique.sql.
+UPSERT_SQL = (
+    "INSERT INTO cart (user_id, product_id, quantity) VALUES (%s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)"
+)
+
+
+class UnknownProductError(Exception):
+    def __init__(self, product_id):
+        self.product_id = product_id
+        super().__init__(f"Product {product_id} is not available.")
+
+
+def add_items(conn, user_id, items):
+    """Merge ``(product_id, quantity)`` pairs into the user's cart."""
+    cursor = conn.cursor()
+    cursor.executemany(UPSERT_SQL, [(user_id, product_id, quantity) for product_id, quantity in items])
+    conn.commit()
+    cursor.close()
+
+
+def load_cart(conn, user_id):
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT c.product_id, p.name, c.quantity, p.price
+        FROM cart c JOIN product_catalog p ON p.id = c.product_id
+        WHERE c.user_id = %s
+        ORDER BY c.product_id
+        """,
+        (user_id,)
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+class CartView:
+    def __init__(self, rows=()):
+        self.lines = OrderedDict()
+        self.loaded_at = time.monotonic()
+        for product_id, name, quantity, price in rows:
+            self.set_line(product_id, name, quantity, price)
+
+    def set_line(self, product_id, name, quantity, price):
+        self.lines[product_id] = {
+            'product_id': product_id,
+            'name': name,
+            'quantity': quantity,
+            'unit_price': float(price),
+            'line_total': round(float(price) * quantity, 2),
+        }
+
+    @property
+    def total(self):
+        return round(sum((line['line_total'] for line in self.lines.values()), 0.0), 2)
+
+    def to_dict(self):
+        return {
+            'items': list(self.lines.values()),
+            'item_count': sum(line['quantity'] for line in self.lines.values()),
+            'total': self.total,
+        }
+
+
+class CartService:
+    """Carts in MySQL, one row per (user, product), with a priced view per user.
+
+    Views are built with one JOIN on first use and then kept in step with the
+    writes made through this service, so reading a cart costs no query until
+    the view is evicted or older than ``ttl``. ``product_lookup(product_id)``
+    returns a catalog row (id, name, description, category, price, stock) or
+    ``None``; it should cost at most one single-row read, never a full
+    catalog load.
+    """
+
+    def __init__(self, connection_factory, product_lookup, ttl=300.0, max_users=10000):
+        self.connection_factory = connection_factory
+        self.product_lookup = product_lookup
+        self.ttl = ttl
+        self.max_users = max_users
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def _cached(self, user_id):
+        view = self._views.get(user_id)
+        if view is None or time.monotonic() - view.loaded_at >= self.ttl:
+            return None
+        self._views.move_to_end(user_id)
+        return view
+
+    def _store(self, user_id, view):
+        self._views[user_id] = view
+        self._views.move_to_end(user_id)
+        while len(self._views) > self.max_users:
+            self._views.popitem(last=False)
+
+    def get(self, user_id):
+        with self._lock:
+            view = self._cached(user_id)
+            if view is not None:
+                self.hits += 1
+                return view
+        with self.connection_factory() as conn:
+            view = CartView(load_cart(conn, user_id))
+        with self._lock:
+            self.loads += 1
+            self._store(user_id, view)
+        return view
+
+    def add(self, user_id, product_id, quantity):
+        """Add ``quantity`` of a product, merging with any existing line; returns the view."""
+        product = self.product_lookup(product_id)
+        if product is None:
+            raise UnknownProductError(product_id)
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute(UPSERT_SQL, (user_id, product_id, quantity))
+            # Read back inside the transaction: another tab may have added the same product.
+            cursor.execute("SELECT quantity FROM cart WHERE user_id = %s AND product_id = %s", (user_id, product_id))
+            merged = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
+        with self._lock:
+            view = self._cached(user_id)
+            if view is not None:
+                view.set_line(product_id, product[1], merged, product[4])
+                return view
+        return self.get(user_id)
+
+    def clear(self, user_id):
+        # Called once the cart rows have been deleted, e.g. by place_order.
+        with self._lock:
+            self._store(user_id, CartView())
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._views.clear()
+            else:
+                self._views.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'cached_carts': len(self._views), 'hits': self.hits, 'loads': self.loads}
@@ -0,0 +1,17 @@
+-- Cart: one row per (user, product)
+-- Merges the duplicate rows left by the old INSERT-only "add to cart", then adds
+-- the key that "add to cart" upserts against. The key also serves lookups by user_id.
+CREATE TEMPORARY TABLE cart_dedup AS
+    SELECT MIN(id) AS keep_id, user_id, product_id, SUM(quantity) AS quantity
+    FROM cart
+    GROUP BY user_id, product_id
+    HAVING COUNT(*) > 1;
+
+UPDATE cart c JOIN cart_dedup d ON c.id = d.keep_id SET c.quantity = d.quantity;
+
+DELETE c FROM cart c
+JOIN cart_dedup d ON c.user_id = d.user_id AND c.product_id = d.product_id AND c.id <> d.keep_id;
+
+DROP TEMPORARY TABLE cart_dedup;
+
+ALTER TABLE cart ADD UNIQUE KEY uq_cart_user_product (user_id, product_id);
@@ -0,0 +1,94 @@
+import time
+import threading
+
+
+class CatalogCache:
+    """Process-local copy of the active product catalog.
+
+    ``loader`` returns the current product rows. Every load stamps the entry
+    with a new version; rendered listings are memoized per (version, language)
+    so they are rebuilt only after the catalog changes or the TTL expires.
+
+    With ``fetch_one(product_id)``, single-product lookups made while there
+    is no fresh snapshot read that one row instead of reloading everything.
+    """
+
+    def __init__(self, loader, ttl=300.0, fetch_one=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.fetch_one = fetch_one
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.single_fetches = 0
+        self._products = None
+        self._loaded_at = 0.0
+        self._rendered = {}
+        self._index = {}
+        self._index_version = None
+        self._lock = threading.Lock()
+
+    def _fresh(self):
+        return self._products is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def get(self):
+        with self._lock:
+            if self._fresh():
+                self.hits += 1
+                return self.version, self._products
+            seen_version = self.version
+        products = self.loader()
+        with self._lock:
+            self.misses += 1
+            if self.version != seen_version:
+                # Invalidated while loading; the rows may predate the write.
+                return self.version, products
+            self.version += 1
+            self._products = products
+            self._loaded_at = time.monotonic()
+            self._rendered.clear()
+            return self.version, products
+
+    def render(self, language, renderer):
+        version, products = self.get()
+        key = (version, language)
+        with self._lock:
+            if key in self._rendered:
+                return self._rendered[key]
+        text = renderer(products, language)
+        with self._lock:
+            if version == self.version:
+                self._rendered[key] = text
+        return text
+
+    def get_product(self, product_id):
+        if self.fetch_one is not None:
+            with self._lock:
+                fresh = self._fresh()
+                if not fresh:
+                    self.single_fetches += 1
+            if not fresh:
+                return self.fetch_one(product_id)
+        version, products = self.get()
+        with self._lock:
+            if self._index_version != version:
+                self._index = {p[0]: p for p in products}
+                self._index_version = version
+            return self._index.get(product_id)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._products = None
+            self._rendered.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self.version,
+                'cached': self._products is not None,
+                'products': len(self._products) if self._products is not None else 0,
+                'hits': self.hits,
+                'misses': self.misses,
+                'single_fetches': self.single_fetches,
+            }
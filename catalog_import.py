@@ -0,0 +1,196 @@
+import time
+from itertools import islice
+
+from openpyxl import load_workbook
+
+STAGING_TABLE = 'product_catalog_staging'
+RETIRED_TABLE = 'product_catalog_old'
+CHUNK_SIZE = 1000
+
+REQUIRED_COLUMNS = ('name', 'price')
+NUMERIC_COLUMNS = {'price': float, 'stock': int, 'is_active': int, 'id': int}
+
+
+class ImportRejected(ValueError):
+    """A replace import that was not swapped in; ``report`` says which rows failed."""
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+def iter_sheet_rows(file):
+    # read_only mode streams rows from the zip instead of building the whole sheet.
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield [str(col).strip() if col is not None else '' for col in header]
+        yield from rows
+    finally:
+        workbook.close()
+
+
+def validate_row(row, columns):
+    record = dict(zip(columns, row))
+    for col in REQUIRED_COLUMNS:
+        if col in record and (record[col] is None or str(record[col]).strip() == ''):
+            raise ValueError(f"missing {col}")
+    values = []
+    for col in columns:
+        value = record.get(col)
+        if isinstance(value, str):
+            value = value.strip()
+        if col in NUMERIC_COLUMNS and value not in (None, ''):
+            try:
+                value = NUMERIC_COLUMNS[col](value)
+            except (TypeError, ValueError):
+                raise ValueError(f"invalid {col}: {value!r}")
+            if col in ('price', 'stock') and value < 0:
+                raise ValueError(f"negative {col}: {value}")
+        elif value == '':
+            value = None
+        values.append(value)
+    return tuple(values)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def next_product_id(cursor):
+    """The first id the live catalog has never handed out."""
+    # information_schema may lag behind (cached table statistics), so also take the highest id
+    # still referenced by the catalog or by past orders.
+    cursor.execute(
+        "SELECT AUTO_INCREMENT FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'product_catalog'"
+    )
+    row = cursor.fetchone()
+    counter = row[0] if row and row[0] else 1
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM product_catalog")
+    max_product = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(MAX(product_id), 0) FROM order_items")
+    max_ordered = cursor.fetchone()[0]
+    return max(int(counter), int(max_product) + 1, int(max_ordered) + 1)
+
+
+def import_catalog(conn, file, mode='replace', chunk_size=CHUNK_SIZE, max_errors=100):
+    """Stream an .xlsx catalog into ``product_catalog``.
+
+    ``replace`` loads every row into a staging table and swaps it in with a
+    single ``RENAME TABLE``; readers never see a half-loaded catalog. The
+    staging table starts numbering where the live one left off, so rows
+    without an ``id`` never reuse the id of a product that carts and orders
+    still point at. ``CREATE TABLE ... LIKE`` copies columns and indexes but
+    not foreign keys: ``product_catalog`` must not declare any, and tables
+    must not reference it with one, or the swap would leave them pointing at
+    the retired table. A replace with no valid rows, or with any rejected
+    row, raises ``ImportRejected`` and leaves the live catalog untouched.
+    ``upsert`` merges rows into the live table by primary key (``id``).
+    Rows are validated one by one and inserted with ``executemany`` per chunk.
+    """
+    if mode not in ('replace', 'upsert'):
+        raise ValueError(f"Unknown import mode: {mode}")
+
+    started = time.monotonic()
+    rows = iter_sheet_rows(file)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("The uploaded sheet is empty")
+
+    cursor = conn.cursor()
+    cursor.execute("SHOW COLUMNS FROM product_catalog")
+    db_columns = [col[0] for col in cursor.fetchall()]
+    positions = [i for i, col in enumerate(header) if col in db_columns]
+    columns = [header[i] for i in positions]
+    if not columns:
+        cursor.close()
+        raise ValueError("No spreadsheet columns match the product_catalog table")
+    if mode == 'upsert' and 'id' not in columns:
+        cursor.close()
+        raise ValueError("Upsert requires an 'id' column")
+
+    if mode == 'replace':
+        cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        cursor.execute(f"CREATE TABLE {STAGING_TABLE} LIKE product_catalog")
+        # LIKE resets AUTO_INCREMENT to 1.
+        cursor.execute(f"ALTER TABLE {STAGING_TABLE} AUTO_INCREMENT = {next_product_id(cursor)}")
+        target = STAGING_TABLE
+    else:
+        target = 'product_catalog'
+
+    column_list = ', '.join(f"`{col}`" for col in columns)
+    placeholders = ', '.join(['%s'] * len(columns))
+    sql = f"INSERT INTO {target} ({column_list}) VALUES ({placeholders})"
+    if mode == 'upsert':
+        updates = ', '.join(f"`{col}` = VALUES(`{col}`)" for col in columns if col != 'id')
+        sql += f" ON DUPLICATE KEY UPDATE {updates}"
+
+    imported = 0
+    rejected = 0
+    errors = []
+    line = 1
+    try:
+        for chunk in chunked(rows, chunk_size):
+            batch = []
+            for row in chunk:
+                line += 1
+                row = [row[i] if i < len(row) else None for i in positions]
+                if all(value is None for value in row):
+                    continue
+                try:
+                    batch.append(validate_row(row, columns))
+                except ValueError as e:
+                    rejected += 1
+                    if len(errors) < max_errors:
+                        errors.append({'row': line, 'error': str(e)})
+            if batch:
+                # mysql-connector turns this into one multi-row INSERT per chunk.
+                cursor.executemany(sql, batch)
+                imported += len(batch)
+
+        if mode == 'replace' and (rejected or not imported):
+            raise ImportRejected(
+                f"Catalog not replaced: {imported} valid rows, {rejected} rejected",
+                _report(mode, imported, rejected, errors, started)
+            )
+
+        if mode == 'replace':
+            # DDL commits implicitly, so the rename is the point of no return.
+            conn.commit()
+            cursor.execute(f"DROP TABLE IF EXISTS {RETIRED_TABLE}")
+            cursor.execute(
+                f"RENAME TABLE product_catalog TO {RETIRED_TABLE}, {STAGING_TABLE} TO product_catalog"
+            )
+            cursor.execute(f"DROP TABLE {RETIRED_TABLE}")
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        if mode == 'replace':
+            cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        raise
+    finally:
+        cursor.close()
+
+    return _report(mode, imported, rejected, errors, started)
+
+
+def _report(mode, imported, rejected, errors, started):
+    elapsed = time.monotonic() - started
+    return {
+        'mode': mode,
+        'rows_imported': imported,
+        'rows_rejected': rejected,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(imported / elapsed, 1) if elapsed > 0 else imported,
+    }
@@ -0,0 +1,16 @@
+-- Chat Transcript Tables
+CREATE TABLE chat_messages (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL,
+    message_id INT NOT NULL,
+    role VARCHAR(20) NOT NULL, -- 'user' or 'assistant'
+    text MEDIUMTEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_chat_messages_user_message (user_id, message_id)
+);
+
+CREATE TABLE chat_summaries (
+    user_id VARCHAR(255) PRIMARY KEY,
+    summary TEXT NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
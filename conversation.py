@@ -0,0 +1,185 @@
+import threading
+
+SUMMARY_PREFIX = "Summary of our conversation so far:"
+SUMMARY_ACK = "Understood, I'll keep that in mind."
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text; good enough for budgeting.
+    return len(text) // 4 + 1
+
+
+def entry_role(entry):
+    return entry['role'] if isinstance(entry, dict) else entry.role
+
+
+def entry_text(entry):
+    parts = entry['parts'] if isinstance(entry, dict) else entry.parts
+    return ''.join(part if isinstance(part, str) else getattr(part, 'text', '') for part in parts)
+
+
+class ConversationContext:
+    """Keeps the model's chat history within a token budget.
+
+    Once the history grows past ``token_budget`` the oldest turns are folded
+    into a rolling summary by ``summarizer(previous_summary, turns)`` and only
+    the newest turns (up to half the budget) are kept verbatim.
+    """
+
+    def __init__(self, summarizer, token_budget=4000, summary=''):
+        self.summarizer = summarizer
+        self.token_budget = token_budget
+        self.summary = summary
+
+    def summary_turns(self):
+        if not self.summary:
+            return []
+        return [
+            {'role': 'user', 'parts': [f"{SUMMARY_PREFIX}\n{self.summary}"]},
+            {'role': 'model', 'parts': [SUMMARY_ACK]},
+        ]
+
+    def tokens(self, history):
+        return sum(estimate_tokens(entry_text(entry)) for entry in history)
+
+    def _recent(self, history, budget):
+        start = len(history)
+        used = 0
+        while start > 0:
+            cost = estimate_tokens(entry_text(history[start - 1]))
+            if start < len(history) and used + cost > budget:
+                break
+            start -= 1
+            used += cost
+        # The history sent to the model has to open with a user turn, so reach
+        # back to the user message that started the oldest kept exchange.
+        while start > 0 and entry_role(history[start]) != 'user':
+            start -= 1
+        if start < len(history) and entry_role(history[start]) != 'user':
+            return []
+        return history[start:]
+
+    def build_history(self, messages):
+        history = []
+        for message in messages:
+            role = 'user' if message['role'] == 'user' else 'model'
+            if not history and role == 'model':
+                continue
+            history.append({'role': role, 'parts': [message['text']]})
+        return self.summary_turns() + self._recent(history, self.token_budget)
+
+    def compact(self, history):
+        """Return a shorter history when ``history`` is over budget, else ``None``."""
+        if self.tokens(history) <= self.token_budget:
+            return None
+        turns = [
+            {'role': entry_role(entry), 'parts': [entry_text(entry)]}
+            for entry in history
+            if not entry_text(entry).startswith(SUMMARY_PREFIX) and entry_text(entry) != SUMMARY_ACK
+        ]
+        kept = self._recent(turns, self.token_budget // 2)
+        folded = turns[:len(turns) - len(kept)]
+        if folded:
+            self.summary = self.summarizer(self.summary, folded)
+        return self.summary_turns() + kept
+
+
+def fallback_summary(previous_summary, turns, max_chars=2000):
+    lines = [previous_summary] if previous_summary else []
+    lines.extend(f"{entry_role(turn)}: {entry_text(turn)[:200]}" for turn in turns)
+    return '\n'.join(lines)[-max_chars:]
+
+
+class TranscriptStore:
+    """Durable chat transcript in MySQL, written in batches off the request path.
+
+    ``append`` only queues the message; a background thread inserts queued
+    messages with one ``executemany`` every ``flush_interval`` seconds or as
+    soon as ``batch_size`` messages are waiting.
+    """
+
+    def __init__(self, connection_factory, batch_size=100, flush_interval=2.0):
+        self.connection_factory = connection_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self.written = 0
+        self.failed_batches = 0
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='transcript-writer', daemon=True)
+            self._thread.start()
+
+    def append(self, user_id, message):
+        with self._cond:
+            self._pending.append((
+                user_id, message['id'], message['role'], message['text'], message['timestamp'][:19].replace('T', ' ')
+            ))
+            self._ensure_thread()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._pending) >= self.batch_size, timeout=self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self._cond:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            with self.connection_factory() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "INSERT IGNORE INTO chat_messages (user_id, message_id, role, text, created_at) "
+                    "VALUES (%s, %s, %s, %s, %s)",
+                    batch
+                )
+                conn.commit()
+                cursor.close()
+            self.written += len(batch)
+        except Exception as e:
+            self.failed_batches += 1
+            print(f"Failed to persist {len(batch)} chat messages: {e}")
+            with self._cond:
+                # Keep them for the next attempt, but do not grow without bound while the DB is down.
+                self._pending = (batch + self._pending)[-self.batch_size * 10:]
+
+    def save_summary(self, user_id, summary):
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO chat_summaries (user_id, summary) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE summary = VALUES(summary)",
+                (user_id, summary)
+            )
+            conn.commit()
+            cursor.close()
+
+    def load(self, user_id, limit=20):
+        with self.connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT message_id, role, text, created_at FROM chat_messages "
+                "WHERE user_id = %s ORDER BY message_id DESC LIMIT %s",
+                (user_id, limit)
+            )
+            rows = cursor.fetchall()
+            cursor.execute("SELECT summary FROM chat_summaries WHERE user_id = %s", (user_id,))
+            summary_row = cursor.fetchone()
+            cursor.close()
+        messages = [
+            {'id': row[0], 'role': row[1], 'text': row[2], 'timestamp': row[3].isoformat() if row[3] else ''}
+            for row in reversed(rows)
+        ]
+        return messages, summary_row[0] if summary_row else ''
+
+    def stats(self):
+        with self._cond:
+            return {'pending': len(self._pending), 'written': self.written, 'failed_batches': self.failed_batches}
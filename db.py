@@ -0,0 +1,162 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+
+
+class PoolExhaustedError(Exception):
+    pass
+
+
+class _PooledConnection:
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """Fixed-size pool of MySQL connections shared by all request handlers.
+
+    Connections are created lazily up to ``size``. On checkout a connection is
+    pinged if it has been idle longer than ``ping_interval`` and replaced when
+    it is dead or older than ``max_lifetime``.
+    """
+
+    def __init__(self, size=5, checkout_timeout=10.0, ping_interval=30.0,
+                 max_lifetime=1800.0, **connect_kwargs):
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.ping_interval = ping_interval
+        self.max_lifetime = max_lifetime
+        self.connect_kwargs = connect_kwargs
+
+        self._idle = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+
+        self.checkouts = 0
+        self.exhausted = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.failed_health_checks = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _connect(self):
+        return _PooledConnection(mysql.connector.connect(**self.connect_kwargs))
+
+    def _discard(self, pooled):
+        try:
+            pooled.raw.close()
+        except Exception:
+            pass
+
+    def _healthy(self, pooled):
+        now = time.monotonic()
+        if now - pooled.created_at > self.max_lifetime:
+            self.recycled += 1
+            return False
+        if now - pooled.last_used > self.ping_interval:
+            try:
+                pooled.raw.ping(reconnect=False)
+            except Exception:
+                self.failed_health_checks += 1
+                return False
+        return True
+
+    def _acquire(self):
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        with self._cond:
+            if not self._idle and self._open >= self.size:
+                self.exhausted += 1
+            while not self._idle and self._open >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolExhaustedError(
+                        f"No database connection available after {self.checkout_timeout}s")
+                self._cond.wait(remaining)
+            if self._idle:
+                pooled = self._idle.pop()
+            else:
+                pooled = None
+                self._open += 1
+            waited = time.monotonic() - started
+            self.checkouts += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+        try:
+            if pooled is not None and not self._healthy(pooled):
+                self._discard(pooled)
+                pooled = None
+            if pooled is None:
+                pooled = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        return pooled
+
+    def _release(self, pooled, broken=False):
+        if not broken:
+            try:
+                if pooled.raw.in_transaction:
+                    pooled.raw.rollback()
+            except Exception:
+                broken = True
+        with self._cond:
+            if broken:
+                self._open -= 1
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+            self._cond.notify()
+        if broken:
+            self._discard(pooled)
+
+    @contextmanager
+    def connection(self):
+        pooled = self._acquire()
+        broken = False
+        try:
+            yield pooled.raw
+        except mysql.connector.errors.OperationalError:
+            broken = True
+            raise
+        except Exception:
+            try:
+                pooled.raw.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self._release(pooled, broken)
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'checkouts': self.checkouts,
+                'exhausted': self.exhausted,
+                'timeouts': self.timeouts,
+                'recycled': self.recycled,
+                'failed_health_checks': self.failed_health_checks,
+                'wait_time_total_seconds': round(self.wait_time_total, 6),
+                'wait_time_max_seconds': round(self.wait_time_max, 6),
+            }
@@ -0,0 +1,125 @@
+import threading
+from collections import deque
+
+
+class Subscription:
+    def __init__(self, hub, channels, max_queue):
+        self.hub = hub
+        self.channels = frozenset(channels)
+        self.max_queue = max_queue
+        self._events = deque()
+        self._cond = threading.Condition()
+        self._overflowed = False
+        self.closed = False
+
+    def _push(self, event):
+        with self._cond:
+            if len(self._events) >= self.max_queue:
+                # Too slow to keep up: drop the backlog and tell the client to reload instead.
+                self._events.clear()
+                self._overflowed = True
+            else:
+                self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the next event, or ``None`` if nothing arrived within ``timeout``."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._events or self._overflowed or self.closed, timeout=timeout):
+                return None
+            if self._overflowed:
+                self._overflowed = False
+                return {'id': None, 'type': 'resync', 'data': {}}
+            if self.closed and not self._events:
+                return None
+            return self._events.popleft()
+
+    def close(self):
+        self.hub._unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+
+class EventHub:
+    """In-process fan-out of events to subscribers of named channels.
+
+    Each event gets an increasing id and the last ``history`` events are kept,
+    so a client that reconnects with the id it saw last (SSE ``Last-Event-ID``)
+    gets what it missed. A subscriber more than ``max_queue`` events behind is
+    sent a ``resync`` event in place of its backlog.
+    """
+
+    def __init__(self, history=1000, max_queue=256):
+        self.max_queue = max_queue
+        self._history = deque(maxlen=history)
+        self._subscribers = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+
+    def publish(self, channels, event_type, data):
+        with self._lock:
+            event = {'id': self._next_id, 'type': event_type, 'data': data, 'channels': frozenset(channels)}
+            self._next_id += 1
+            self._history.append(event)
+            targets = set()
+            for channel in channels:
+                targets.update(self._subscribers.get(channel, ()))
+            self.published += 1
+            self.delivered += len(targets)
+        for subscription in targets:
+            subscription._push(event)
+        return event['id']
+
+    def subscribe(self, channels, last_event_id=None):
+        subscription = Subscription(self, channels, self.max_queue)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+            if last_event_id is not None:
+                if self._history and self._history[0]['id'] > last_event_id + 1:
+                    subscription._overflowed = True
+                else:
+                    for event in self._history:
+                        if event['id'] > last_event_id and event['channels'] & subscription.channels:
+                            subscription._push(event)
+        return subscription
+
+    def poll(self, channels, last_event_id, timeout):
+        """Wait up to ``timeout`` seconds for events after ``last_event_id`` and return them."""
+        subscription = self.subscribe(channels, last_event_id)
+        try:
+            events = []
+            event = subscription.get(timeout)
+            while event is not None and len(events) < self.max_queue:
+                events.append(event)
+                event = subscription.get(0)
+            return events
+        finally:
+            subscription.close()
+
+    @property
+    def last_event_id(self):
+        with self._lock:
+            return self._next_id - 1
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len({s for subscribers in self._subscribers.values() for s in subscribers}),
+                'channels': len(self._subscribers),
+                'published': self.published,
+                'delivered': self.delivered,
+                'last_event_id': self._next_id - 1,
+            }
@@ -0,0 +1,97 @@
+import re
+import time
+import threading
+
+
+class IntentRouter:
+    """Dispatches chat messages to local handlers with one regex scan.
+
+    Every registered pattern becomes a named alternative of a single compiled
+    expression, so a message is scanned once no matter how many intents exist.
+    The leftmost match wins; on a tie the intent registered first wins.
+    Handlers receive the pattern's own capture groups as a tuple.
+    """
+
+    def __init__(self, flags=re.IGNORECASE):
+        self.flags = flags
+        self._intents = []
+        self._combined = None
+        self._group_slices = {}
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.seconds = {}
+        self.unmatched = 0
+
+    def register(self, name, pattern, handler):
+        if not name.isidentifier():
+            raise ValueError(f"Intent name must be an identifier: {name!r}")
+        if any(existing[0] == name for existing in self._intents):
+            raise ValueError(f"Intent already registered: {name}")
+        re.compile(pattern, self.flags)
+        self._intents.append((name, pattern, handler))
+        self.hits[name] = 0
+        self.seconds[name] = 0.0
+        self._combined = None
+
+    def intent(self, name, pattern):
+        def decorator(handler):
+            self.register(name, pattern, handler)
+            return handler
+        return decorator
+
+    def _compile(self):
+        parts = []
+        group_slices = {}
+        group_index = 0
+        for name, pattern, handler in self._intents:
+            inner_groups = re.compile(pattern, self.flags).groups
+            parts.append(f"(?P<{name}>{pattern})")
+            # Outer wrapper group first, then the pattern's own groups.
+            group_slices[name] = (group_index + 1, group_index + 1 + inner_groups, handler)
+            group_index += 1 + inner_groups
+        self._group_slices = group_slices
+        self._combined = re.compile('|'.join(parts), self.flags)
+
+    def match(self, message):
+        if self._combined is None:
+            self._compile()
+        found = self._combined.search(message)
+        if found is None:
+            with self._lock:
+                self.unmatched += 1
+            return None
+        name = found.lastgroup
+        start, end, handler = self._group_slices[name]
+        return name, found.groups()[start:end], handler
+
+    def route(self, message, **context):
+        matched = self.match(message)
+        if matched is None:
+            return None
+        return self.dispatch(matched, **context)
+
+    def dispatch(self, matched, **context):
+        """Run the handler for a result of ``match``."""
+        name, groups, handler = matched
+        started = time.perf_counter()
+        try:
+            return handler(groups, **context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.hits[name] += 1
+                self.seconds[name] += elapsed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'intents': {
+                    name: {
+                        'hits': self.hits[name],
+                        'total_seconds': round(self.seconds[name], 6),
+                        'avg_seconds': round(self.seconds[name] / self.hits[name], 6) if self.hits[name] else 0.0,
+                    }
+                    for name, _, _ in self._intents
+                },
+                'unmatched': self.unmatched,
+            }
@@ -0,0 +1,79 @@
+import asyncio
+import queue
+import concurrent.futures
+import threading
+
+_DONE = object()
+
+
+class AsyncLLMRunner:
+    """Runs every Gemini call on one shared background event loop.
+
+    Request threads only wait on a queue of text chunks, so the network I/O of
+    all concurrent conversations is multiplexed on a single loop and tokens can
+    be forwarded to the browser as soon as they arrive.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=self._loop.run_forever, name='llm-event-loop', daemon=True)
+                thread.start()
+            return self._loop
+
+    async def _pump(self, chat, message, chunks):
+        try:
+            if hasattr(chat, 'send_message_async'):
+                response = await chat.send_message_async(message, stream=True)
+                async for chunk in response:
+                    text = getattr(chunk, 'text', '')
+                    if text:
+                        chunks.put(text)
+            else:
+                response = await asyncio.get_running_loop().run_in_executor(None, chat.send_message, message)
+                chunks.put(getattr(response, 'text', ''))
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(_DONE)
+
+    def stream(self, chat, message, timeout=60.0):
+        chunks = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._pump(chat, message, chunks), self._ensure_loop())
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No response from the AI service within {timeout}s")
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    async def _generate(self, model, prompt):
+        if hasattr(model, 'generate_content_async'):
+            response = await model.generate_content_async(prompt)
+        else:
+            response = await asyncio.get_running_loop().run_in_executor(None, model.generate_content, prompt)
+        return getattr(response, 'text', '')
+
+    def generate(self, model, prompt, timeout=60.0):
+        """One ``generate_content`` call outside any chat, abandoned after ``timeout`` seconds."""
+        future = asyncio.run_coroutine_threadsafe(self._generate(model, prompt), self._ensure_loop())
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"No response from the AI service within {timeout}s")
+
+    def send(self, chat, message, timeout=60.0):
+        return ''.join(self.stream(chat, message, timeout=timeout))
@@ -0,0 +1,151 @@
+import re
+import time
+import threading
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_MAX_AGE = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+class OAuthError(Exception):
+    pass
+
+
+def create_http_session(pool_maxsize=20, retries=3, backoff_factor=0.3):
+    """A keep-alive ``requests.Session`` shared by all outbound login calls.
+
+    Only idempotent requests are retried: the token exchange is a POST with a
+    single-use authorization code and must not be replayed.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry)
+    http = requests.Session()
+    http.mount('https://', adapter)
+    http.mount('http://', adapter)
+    return http
+
+
+def cache_lifetime(headers, default_ttl):
+    cache_control = headers.get('Cache-Control', '')
+    if 'no-store' in cache_control or 'no-cache' in cache_control:
+        return 0
+    max_age = _MAX_AGE.search(cache_control)
+    if max_age is None:
+        return default_ttl
+    try:
+        age = int(headers.get('Age', 0))
+    except ValueError:
+        age = 0
+    return max(0, int(max_age.group(1)) - age)
+
+
+class DiscoveryCache:
+    """The OpenID discovery document, refetched when its ``max-age`` runs out.
+
+    Concurrent logins that find it expired wait for a single refresh. If the
+    refresh fails the previous document keeps being served and the next
+    attempt is made after ``retry_after`` seconds.
+    """
+
+    def __init__(self, http, url, timeout=(3.05, 10), default_ttl=3600, retry_after=30):
+        self.http = http
+        self.url = url
+        self.timeout = timeout
+        self.default_ttl = default_ttl
+        self.retry_after = retry_after
+        self._document = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fetches = 0
+        self.errors = 0
+
+    def get(self):
+        if self._document is not None and time.monotonic() < self._expires_at:
+            self.hits += 1
+            return self._document
+        with self._lock:
+            if self._document is not None and time.monotonic() < self._expires_at:
+                self.hits += 1
+                return self._document
+            try:
+                response = self.http.get(self.url, timeout=self.timeout)
+                response.raise_for_status()
+                document = response.json()
+            except (requests.RequestException, ValueError) as e:
+                self.errors += 1
+                if self._document is None:
+                    raise OAuthError(f"Could not load OpenID configuration: {e}")
+                print(f"Refreshing OpenID configuration failed, serving the cached copy: {e}")
+                self._expires_at = time.monotonic() + self.retry_after
+                return self._document
+            self.fetches += 1
+            self._document = document
+            self._expires_at = time.monotonic() + cache_lifetime(response.headers, self.default_ttl)
+            return document
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'fetches': self.fetches,
+            'errors': self.errors,
+            'cached': self._document is not None,
+            'expires_in_seconds': round(max(0.0, self._expires_at - time.monotonic()), 1),
+        }
+
+
+class GoogleOAuthClient:
+    def __init__(self, discovery_url, client_id, client_secret, redirect_uri, http=None, timeout=(3.05, 10)):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.http = http or create_http_session()
+        self.timeout = timeout
+        self.discovery = DiscoveryCache(self.http, discovery_url, timeout=timeout)
+
+    def authorization_url(self):
+        params = {
+            'client_id': self.client_id,
+            'response_type': 'code',
+            'scope': 'openid email profile',
+            'redirect_uri': self.redirect_uri,
+            'access_type': 'offline',
+        }
+        return f"{self.discovery.get()['authorization_endpoint']}?{urlencode(params)}"
+
+    def exchange_code(self, code):
+        response = self.http.post(
+            self.discovery.get()['token_endpoint'],
+            data={
+                'code': code,
+                'client_id': self.client_id,
+                'client_secret': self.client_secret,
+                'redirect_uri': self.redirect_uri,
+                'grant_type': 'authorization_code',
+            },
+            headers={'Content-Type': 'application/x-www-form-urlencoded'},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise OAuthError(f"Error getting tokens: {response.text}")
+        return response.json()
+
+    def userinfo(self, access_token):
+        response = self.http.get(
+            self.discovery.get()['userinfo_endpoint'],
+            headers={'Authorization': f"Bearer {access_token}"},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise OAuthError(f"Error getting user info: {response.text}")
+        return response.json()
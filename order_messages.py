@@ -0,0 +1,82 @@
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_MESSAGE_LENGTH = 2000
+
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class OrderNotFoundError(Exception):
+    pass
+
+
+def message_to_dict(order_id, row):
+    return {
+        'id': row[0],
+        'order_id': order_id,
+        'sender': row[1],
+        'message': row[2],
+        'sent_at': row[3].strftime(_TIMESTAMP_FORMAT) if row[3] else '',
+    }
+
+
+def order_owner(conn, order_id):
+    cursor = conn.cursor()
+    cursor.execute("SELECT user_id FROM orders WHERE id = %s", (order_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None:
+        raise OrderNotFoundError(f"Order {order_id} not found")
+    return row[0]
+
+
+def has_thread(conn, user_id):
+    """Whether any of the user's orders has a message."""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT 1 FROM orders o JOIN order_messages m ON m.order_id = o.id WHERE o.user_id = %s LIMIT 1",
+        (user_id,)
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    return row is not None
+
+
+def send_message(conn, order_id, sender, text):
+    text = (text or '').strip()
+    if not text:
+        raise ValueError("Message is empty")
+    if len(text) > MAX_MESSAGE_LENGTH:
+        raise ValueError(f"Message is longer than {MAX_MESSAGE_LENGTH} characters")
+    # Stamped here rather than by the column default so it can be returned without a re-read.
+    sent_at = datetime.now().replace(microsecond=0)
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO order_messages (order_id, sender, message, sent_at) VALUES (%s, %s, %s, %s)",
+        (order_id, sender, text, sent_at)
+    )
+    message_id = cursor.lastrowid
+    conn.commit()
+    cursor.close()
+    return message_to_dict(order_id, (message_id, sender, text, sent_at))
+
+
+def list_messages(conn, order_id, after_id=None, limit=DEFAULT_PAGE_SIZE):
+    """Return an order's messages oldest first, optionally only those after ``after_id``.
+
+    Served by ``idx_order_messages_order_sent`` as one range scan of the order's rows.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    sql = "SELECT id, sender, message, sent_at FROM order_messages WHERE order_id = %s"
+    params = [order_id]
+    if after_id is not None:
+        sql += " AND id > %s"
+        params.append(after_id)
+    sql += " ORDER BY sent_at, id LIMIT %s"
+    params.append(limit)
+    cursor = conn.cursor()
+    cursor.execute(sql, tuple(params))
+    rows = cursor.fetchall()
+    cursor.close()
+    return [message_to_dict(order_id, row) for row in rows]
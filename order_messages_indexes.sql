@@ -0,0 +1,4 @@
+-- Order Messages Indexes
+-- A thread is read with WHERE order_id = ? ORDER BY sent_at, id; InnoDB appends the id to the index,
+-- so this is one range scan with no filesort.
+CREATE INDEX idx_order_messages_order_sent ON order_messages (order_id, sent_at);
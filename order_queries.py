@@ -0,0 +1,201 @@
+import re
+from datetime import datetime, timedelta
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_STATS_DAYS = 30
+
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+_LEGACY_ITEM = re.compile(r"product_id=(\d+),\s*quantity=(\d+)")
+
+
+def encode_cursor(placed_at, order_id):
+    return f"{placed_at.strftime(_TIMESTAMP_FORMAT)}|{order_id}"
+
+
+def decode_cursor(cursor):
+    placed_at, _, order_id = cursor.partition('|')
+    return datetime.strptime(placed_at, _TIMESTAMP_FORMAT), int(order_id)
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+
+def date_range(date_from=None, date_to=None, default_days=DEFAULT_STATS_DAYS):
+    # ``date_to`` is inclusive for callers; queries use a half-open range.
+    end = (date_to or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)) + timedelta(days=1)
+    start = date_from or end - timedelta(days=default_days)
+    return start, end
+
+
+def list_orders(conn, cursor=None, user_id=None, date_from=None, date_to=None, limit=DEFAULT_PAGE_SIZE):
+    """Return a page of orders, newest first, with their line items.
+
+    Pages are keyed on ``(placed_at, id)`` so each page is a range scan of
+    ``idx_orders_placed_at`` (or ``idx_orders_user_placed_at`` with a user filter).
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    clauses = []
+    params = []
+    if user_id:
+        clauses.append("user_id = %s")
+        params.append(user_id)
+    if date_from:
+        clauses.append("placed_at >= %s")
+        params.append(date_from)
+    if date_to:
+        clauses.append("placed_at < %s")
+        params.append(date_to + timedelta(days=1))
+    if cursor:
+        placed_at, order_id = decode_cursor(cursor)
+        clauses.append("(placed_at < %s OR (placed_at = %s AND id < %s))")
+        params.extend([placed_at, placed_at, order_id])
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+
+    db_cursor = conn.cursor()
+    db_cursor.execute(
+        f"SELECT id, user_id, order_details, placed_at FROM orders {where}"
+        "ORDER BY placed_at DESC, id DESC LIMIT %s",
+        tuple(params) + (limit + 1,)
+    )
+    rows = db_cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][3], rows[-1][0])
+
+    items = {}
+    if rows:
+        placeholders = ', '.join(['%s'] * len(rows))
+        db_cursor.execute(
+            "SELECT oi.order_id, oi.product_id, p.name, oi.quantity, oi.unit_price "
+            "FROM order_items oi LEFT JOIN product_catalog p ON p.id = oi.product_id "
+            f"WHERE oi.order_id IN ({placeholders}) ORDER BY oi.order_id, oi.id",
+            tuple(row[0] for row in rows)
+        )
+        for order_id, product_id, name, quantity, unit_price in db_cursor.fetchall():
+            items.setdefault(order_id, []).append({
+                'product_id': product_id,
+                'name': name,
+                'quantity': quantity,
+                'unit_price': float(unit_price),
+            })
+    db_cursor.close()
+
+    orders = [
+        {
+            'id': row[0],
+            'user_id': row[1],
+            'order_details': row[2],
+            'placed_at': row[3].strftime(_TIMESTAMP_FORMAT) if row[3] else '',
+            'items': items.get(row[0], []),
+            'total': round(sum(item['quantity'] * item['unit_price'] for item in items.get(row[0], [])), 2),
+        }
+        for row in rows
+    ]
+    return orders, next_cursor
+
+
+def _fetch(conn, sql, params):
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def revenue_per_day(conn, date_from=None, date_to=None):
+    start, end = date_range(date_from, date_to)
+    rows = _fetch(
+        conn,
+        "SELECT DATE(o.placed_at) AS day, COUNT(DISTINCT o.id), SUM(oi.quantity * oi.unit_price) "
+        "FROM orders o JOIN order_items oi ON oi.order_id = o.id "
+        "WHERE o.placed_at >= %s AND o.placed_at < %s GROUP BY day ORDER BY day",
+        (start, end)
+    )
+    return [{'day': day.isoformat(), 'orders': count, 'revenue': float(revenue or 0)} for day, count, revenue in rows]
+
+
+def top_products(conn, date_from=None, date_to=None, limit=10):
+    start, end = date_range(date_from, date_to)
+    rows = _fetch(
+        conn,
+        "SELECT oi.product_id, p.name, SUM(oi.quantity) AS units, SUM(oi.quantity * oi.unit_price) "
+        "FROM orders o JOIN order_items oi ON oi.order_id = o.id "
+        "LEFT JOIN product_catalog p ON p.id = oi.product_id "
+        "WHERE o.placed_at >= %s AND o.placed_at < %s "
+        "GROUP BY oi.product_id, p.name ORDER BY units DESC LIMIT %s",
+        (start, end, max(1, min(int(limit), 100)))
+    )
+    return [
+        {'product_id': pid, 'name': name, 'units': int(units), 'revenue': float(revenue or 0)}
+        for pid, name, units, revenue in rows
+    ]
+
+
+def units_per_category(conn, date_from=None, date_to=None):
+    start, end = date_range(date_from, date_to)
+    rows = _fetch(
+        conn,
+        "SELECT COALESCE(p.category, 'Unknown') AS category, SUM(oi.quantity), SUM(oi.quantity * oi.unit_price) "
+        "FROM orders o JOIN order_items oi ON oi.order_id = o.id "
+        "LEFT JOIN product_catalog p ON p.id = oi.product_id "
+        "WHERE o.placed_at >= %s AND o.placed_at < %s "
+        "GROUP BY category ORDER BY 2 DESC",
+        (start, end)
+    )
+    return [{'category': category, 'units': int(units), 'revenue': float(revenue or 0)} for category, units, revenue in rows]
+
+
+def backfill_order_items(conn, batch_size=1000):
+    """Create order_items rows for orders placed before the table existed.
+
+    Legacy orders only kept the ``order_details`` text; the product's current
+    price stands in for the unit price.
+    """
+    cursor = conn.cursor()
+    filled = 0
+    last_id = 0
+    while True:
+        cursor.execute(
+            "SELECT o.id, o.order_details FROM orders o "
+            "WHERE o.id > %s AND NOT EXISTS (SELECT 1 FROM order_items oi WHERE oi.order_id = o.id) "
+            "ORDER BY o.id LIMIT %s",
+            (last_id, batch_size)
+        )
+        orders = cursor.fetchall()
+        if not orders:
+            break
+        last_id = orders[-1][0]
+        items = [
+            (order_id, int(pid), int(quantity), int(pid))
+            for order_id, details in orders
+            for pid, quantity in _LEGACY_ITEM.findall(details or '')
+        ]
+        if items:
+            cursor.executemany(
+                "INSERT INTO order_items (order_id, product_id, quantity, unit_price) "
+                "SELECT %s, %s, %s, COALESCE((SELECT price FROM product_catalog WHERE id = %s), 0)",
+                items
+            )
+            filled += len(items)
+        conn.commit()
+    cursor.close()
+    return filled
+
+
+if __name__ == '__main__':
+    import os
+    import mysql.connector
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    connection = mysql.connector.connect(
+        host=os.getenv('MYSQL_HOST', 'localhost'),
+        user=os.getenv('MYSQL_USER', 'root'),
+        password=os.getenv('MYSQL_PASSWORD', ''),
+        database=os.getenv('MYSQL_DB', 'grocery_db')
+    )
+    print(f"Backfilled {backfill_order_items(connection)} order items")
+    connection.close()
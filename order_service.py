@@ -0,0 +1,95 @@
+import mysql.connector
+
+# ER_LOCK_DEADLOCK and ER_LOCK_WAIT_TIMEOUT: the transaction was rolled back and may be retried.
+RETRYABLE_ERRNOS = (1213, 1205)
+
+
+class OrderError(Exception):
+    pass
+
+
+class EmptyCartError(OrderError):
+    pass
+
+
+class InsufficientStockError(OrderError):
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(f"Insufficient stock for product_id={', '.join(str(pid) for pid in product_ids)}")
+
+
+def _place_order_once(conn, user_id):
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+        cursor.execute(
+            "SELECT product_id, quantity FROM cart WHERE user_id=%s ORDER BY product_id FOR UPDATE",
+            (user_id,)
+        )
+        quantities = {}
+        for product_id, quantity in cursor.fetchall():
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        if not quantities:
+            raise EmptyCartError("Your cart is empty. Add products before placing an order.")
+
+        # Lock every product row in id order so concurrent orders cannot deadlock on each other.
+        product_ids = sorted(quantities)
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        cursor.execute(
+            f"SELECT id, stock, price FROM product_catalog WHERE id IN ({placeholders}) ORDER BY id FOR UPDATE",
+            tuple(product_ids)
+        )
+        products = {row[0]: row for row in cursor.fetchall()}
+        short = [pid for pid in product_ids if pid not in products or products[pid][1] < quantities[pid]]
+        if short:
+            raise InsufficientStockError(short)
+
+        cases = ' '.join(['WHEN %s THEN %s'] * len(product_ids))
+        params = [value for pid in product_ids for value in (pid, quantities[pid])]
+        cursor.execute(
+            f"UPDATE product_catalog SET stock = stock - CASE id {cases} END WHERE id IN ({placeholders})",
+            tuple(params + product_ids)
+        )
+
+        order_details = ", ".join(f"product_id={pid}, quantity={quantities[pid]}" for pid in product_ids)
+        cursor.execute(
+            "INSERT INTO orders (user_id, order_details) VALUES (%s, %s)",
+            (user_id, order_details)
+        )
+        order_id = cursor.lastrowid
+        items = [(order_id, pid, quantities[pid], products[pid][2]) for pid in product_ids]
+        cursor.executemany(
+            "INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (%s, %s, %s, %s)",
+            items
+        )
+        cursor.execute("DELETE FROM cart WHERE user_id=%s", (user_id,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return {
+        'order_id': order_id,
+        'items': [
+            {'product_id': pid, 'quantity': quantity, 'unit_price': float(price)}
+            for _, pid, quantity, price in items
+        ],
+        'total': float(sum(quantity * price for _, _, quantity, price in items)),
+    }
+
+
+def place_order(conn, user_id, retries=3):
+    """Turn the user's cart into an order in a single transaction.
+
+    The cart and product rows are locked with ``SELECT ... FOR UPDATE``, stock
+    is checked for every line before anything is written, and all lines are
+    decremented by one ``UPDATE``. Deadlocks and lock wait timeouts are retried.
+    """
+    for attempt in range(retries):
+        try:
+            return _place_order_once(conn, user_id)
+        except mysql.connector.errors.DatabaseError as e:
+            if e.errno not in RETRYABLE_ERRNOS or attempt == retries - 1:
+                raise
@@ -0,0 +1,6 @@
+-- Orders Indexes
+-- Keyset pagination of /admin/orders walks (placed_at, id); the user filter uses the second index.
+CREATE INDEX idx_orders_placed_at ON orders (placed_at, id);
+CREATE INDEX idx_orders_user_placed_at ON orders (user_id, placed_at, id);
+-- Lets the sales reports aggregate order lines without touching the base rows.
+CREATE INDEX idx_order_items_order_totals ON order_items (order_id, product_id, quantity, unit_price);
@@ -0,0 +1,8 @@
+-- Product Catalog Indexes
+-- Support the filters used by /api/products and the "search products:" chat intent.
+-- InnoDB appends the primary key to every secondary index, so each of these also
+-- serves the keyset pagination on id.
+CREATE INDEX idx_product_catalog_category ON product_catalog (category);
+CREATE INDEX idx_product_catalog_active_stock ON product_catalog (is_active, stock);
+CREATE INDEX idx_product_catalog_price ON product_catalog (price);
+CREATE FULLTEXT INDEX ft_product_catalog_name_description ON product_catalog (name, description);
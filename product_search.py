@@ -0,0 +1,70 @@
+import re
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]')
+
+
+def fulltext_query(keyword):
+    # Each word must match, as a prefix, in BOOLEAN MODE.
+    words = _BOOLEAN_OPERATORS.sub(' ', keyword).split()
+    return ' '.join(f'+{word}*' for word in words)
+
+
+def search_products(conn, keyword=None, category=None, min_price=None,
+                    max_price=None, after_id=None, limit=DEFAULT_PAGE_SIZE):
+    """Return one page of active, in-stock products and the cursor for the next page.
+
+    Pages are keyed on ``id`` (keyset pagination), so every page is an index
+    range scan regardless of how deep the client has paged.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    clauses = ["is_active = 1", "stock > 0"]
+    params = []
+
+    if keyword:
+        query = fulltext_query(keyword)
+        if query:
+            clauses.append("MATCH(name, description) AGAINST (%s IN BOOLEAN MODE)")
+            params.append(query)
+    if category:
+        clauses.append("category = %s")
+        params.append(category)
+    if min_price is not None:
+        clauses.append("price >= %s")
+        params.append(min_price)
+    if max_price is not None:
+        clauses.append("price <= %s")
+        params.append(max_price)
+    if after_id is not None:
+        clauses.append("id > %s")
+        params.append(after_id)
+
+    sql = (
+        "SELECT id, name, description, category, price, stock FROM product_catalog "
+        f"WHERE {' AND '.join(clauses)} ORDER BY id LIMIT %s"
+    )
+    params.append(limit + 1)
+
+    cursor = conn.cursor()
+    cursor.execute(sql, tuple(params))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0]
+    return rows, next_cursor
+
+
+def product_to_dict(row):
+    return {
+        'id': row[0],
+        'name': row[1],
+        'description': row[2],
+        'category': row[3],
+        'price': float(row[4]),
+        'stock': row[5],
+    }
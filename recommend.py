@@ -0,0 +1,276 @@
+import math
+import time
+import heapq
+import threading
+from array import array
+
+
+def iter_order_lines(connection_factory, batch_size=10000):
+    """Yield ``(order_id, product_id)`` for every order line, in order id order."""
+    with connection_factory() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT order_id, product_id FROM order_items ORDER BY order_id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+        cursor.close()
+
+
+def _baskets(lines):
+    order_id, basket = None, set()
+    for line_order_id, product_id in lines:
+        if line_order_id != order_id:
+            if basket:
+                yield order_id, basket
+            order_id, basket = line_order_id, set()
+        basket.add(product_id)
+    if basket:
+        yield order_id, basket
+
+
+class _Matrix:
+    """Co-purchase counts in compressed sparse rows.
+
+    Row ``r`` of product ``ids[r]`` holds its neighbours in
+    ``neighbors[offsets[r]:offsets[r + 1]]`` with the matching pair counts in
+    ``counts``; ``support`` is the number of orders containing each product.
+    """
+
+    def __init__(self, support, pairs, orders, max_order_id):
+        adjacency = {}
+        for (a, b), count in pairs.items():
+            adjacency.setdefault(a, []).append((b, count))
+            adjacency.setdefault(b, []).append((a, count))
+        self.ids = array('i', sorted(support))
+        self.index = {product_id: row for row, product_id in enumerate(self.ids)}
+        self.support = array('I', (support[product_id] for product_id in self.ids))
+        self.offsets = array('I', [0])
+        self.neighbors = array('i')
+        self.counts = array('I')
+        for product_id in self.ids:
+            for neighbor, count in adjacency.get(product_id, ()):
+                self.neighbors.append(neighbor)
+                self.counts.append(count)
+            self.offsets.append(len(self.neighbors))
+        self.orders = orders
+        self.max_order_id = max_order_id
+
+
+class CoPurchaseIndex:
+    """"Bought together" scores built from past orders.
+
+    ``loader()`` yields ``(order_id, product_id)`` order lines sorted by order
+    id. The full scan is packed into a ``_Matrix``; orders placed afterwards
+    are added with ``record_order`` to a small overlay that is folded into the
+    arrays every ``compact_every`` new pairs. Products are scored by cosine
+    similarity, ``pair_count / sqrt(support_a * support_b)``, and each
+    product's top ``top_n`` neighbours are memoized until one of its orders
+    changes them, so router lookups are dictionary reads.
+
+    A full rescan runs in the background every ``rebuild_interval`` seconds to
+    pick up orders placed by other processes.
+    """
+
+    def __init__(self, loader, top_n=20, min_pair_count=2, max_basket=50,
+                 compact_every=20000, rebuild_interval=86400.0):
+        self.loader = loader
+        self.top_n = top_n
+        self.min_pair_count = min_pair_count
+        self.max_basket = max_basket
+        self.compact_every = compact_every
+        self.rebuild_interval = rebuild_interval
+        self._matrix = None
+        self._built_at = 0.0
+        self._delta_support = {}
+        self._delta_pairs = {}
+        self._delta_size = 0
+        self._delta_orders = 0
+        self._top = {}
+        self._rebuilding = False
+        self._replay = []
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.builds = 0
+
+    def _build(self):
+        support = {}
+        pairs = {}
+        orders = 0
+        max_order_id = 0
+        for order_id, basket in _baskets(self.loader()):
+            orders += 1
+            max_order_id = max(max_order_id, order_id)
+            products = sorted(basket)[:self.max_basket]
+            for i, a in enumerate(products):
+                support[a] = support.get(a, 0) + 1
+                for b in products[i + 1:]:
+                    pairs[(a, b)] = pairs.get((a, b), 0) + 1
+        return _Matrix(support, pairs, orders, max_order_id)
+
+    def _install(self, matrix):
+        with self._lock:
+            self._matrix = matrix
+            self._built_at = time.monotonic()
+            self._delta_support = {}
+            self._delta_pairs = {}
+            self._delta_size = 0
+            self._delta_orders = 0
+            self._top = {}
+            replay, self._replay = self._replay, []
+            self._rebuilding = False
+            self.builds += 1
+            for order_id, product_ids in replay:
+                if order_id > matrix.max_order_id:
+                    self._add_order(product_ids)
+
+    def _ensure_loaded(self):
+        if self._matrix is None:
+            with self._build_lock:
+                if self._matrix is None:
+                    with self._lock:
+                        self._rebuilding = True
+                    try:
+                        self._install(self._build())
+                    except Exception:
+                        with self._lock:
+                            self._rebuilding = False
+                        raise
+            return
+        if time.monotonic() - self._built_at >= self.rebuild_interval and not self._rebuilding:
+            with self._lock:
+                if self._rebuilding:
+                    return
+                self._rebuilding = True
+            threading.Thread(target=self._rebuild_in_background, name='copurchase-rebuild', daemon=True).start()
+
+    @property
+    def ready(self):
+        return self._matrix is not None
+
+    def warm(self):
+        """Start the initial build in the background if nothing has started it yet."""
+        with self._lock:
+            if self._matrix is not None or self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name='copurchase-rebuild', daemon=True).start()
+
+    def _rebuild_in_background(self):
+        try:
+            with self._build_lock:
+                matrix = self._build()
+            self._install(matrix)
+        except Exception as e:
+            print(f"Rebuilding the co-purchase index failed: {e}")
+            with self._lock:
+                self._rebuilding = False
+                self._built_at = time.monotonic()
+
+    def _support(self, product_id):
+        row = self._matrix.index.get(product_id)
+        base = self._matrix.support[row] if row is not None else 0
+        return base + self._delta_support.get(product_id, 0)
+
+    def _row(self, product_id):
+        counts = dict(self._delta_pairs.get(product_id, ()))
+        matrix = self._matrix
+        row = matrix.index.get(product_id)
+        if row is not None:
+            for j in range(matrix.offsets[row], matrix.offsets[row + 1]):
+                neighbor = matrix.neighbors[j]
+                counts[neighbor] = counts.get(neighbor, 0) + matrix.counts[j]
+        return counts
+
+    def _neighbors(self, product_id):
+        top = self._top.get(product_id)
+        if top is None:
+            support = self._support(product_id)
+            candidates = (
+                (count / math.sqrt(support * self._support(other)), other)
+                for other, count in self._row(product_id).items()
+                if count >= self.min_pair_count
+            )
+            top = self._top[product_id] = heapq.nlargest(self.top_n, candidates)
+        return top
+
+    def _add_order(self, product_ids):
+        products = sorted(set(product_ids))[:self.max_basket]
+        for i, a in enumerate(products):
+            self._delta_support[a] = self._delta_support.get(a, 0) + 1
+            self._top.pop(a, None)
+            for b in products[i + 1:]:
+                for x, y in ((a, b), (b, a)):
+                    row = self._delta_pairs.setdefault(x, {})
+                    if y not in row:
+                        self._delta_size += 1
+                    row[y] = row.get(y, 0) + 1
+        self._delta_orders += 1
+
+    def _compact(self):
+        matrix = self._matrix
+        support = {product_id: self._support(product_id) for product_id in set(matrix.index) | set(self._delta_support)}
+        pairs = {}
+        for product_id in support:
+            for other, count in self._row(product_id).items():
+                if product_id < other:
+                    pairs[(product_id, other)] = count
+        self._matrix = _Matrix(support, pairs, matrix.orders + self._delta_orders, matrix.max_order_id)
+        self._delta_support = {}
+        self._delta_pairs = {}
+        self._delta_size = 0
+        self._delta_orders = 0
+
+    def record_order(self, order_id, product_ids):
+        """Count a newly placed order without rescanning the history."""
+        with self._lock:
+            if self._rebuilding:
+                self._replay.append((order_id, list(product_ids)))
+            if self._matrix is None:
+                return
+            self._add_order(product_ids)
+            if self._delta_size >= self.compact_every:
+                self._compact()
+
+    def also_bought(self, product_id, limit=5, exclude=()):
+        """Return up to ``limit`` ``(product_id, score)`` pairs, best first."""
+        self._ensure_loaded()
+        started = time.perf_counter()
+        with self._lock:
+            result = [(other, score) for score, other in self._neighbors(product_id) if other not in exclude][:limit]
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - started
+        return result
+
+    def complete_basket(self, product_ids, limit=5, exclude=()):
+        """Products most often bought with the basket as a whole, best first."""
+        self._ensure_loaded()
+        started = time.perf_counter()
+        basket = set(product_ids)
+        scores = {}
+        with self._lock:
+            for product_id in basket:
+                for score, other in self._neighbors(product_id):
+                    if other not in basket and other not in exclude:
+                        scores[other] = scores.get(other, 0.0) + score
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - started
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def stats(self):
+        with self._lock:
+            matrix = self._matrix
+            return {
+                'built': matrix is not None,
+                'builds': self.builds,
+                'products': len(matrix.ids) if matrix is not None else 0,
+                'pairs': len(matrix.neighbors) // 2 if matrix is not None else 0,
+                'orders': matrix.orders + self._delta_orders if matrix is not None else 0,
+                'pending_pairs': self._delta_size // 2,
+                'memoized_products': len(self._top),
+                'queries': self.queries,
+                'avg_query_seconds': round(self.query_seconds / self.queries, 7) if self.queries else 0.0,
+            }
@@ -0,0 +1,171 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class AdmissionRejected(Exception):
+    pass
+
+
+class RateLimited(AdmissionRejected):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class ConcurrencyGate:
+    """Caps concurrent calls to an upstream service.
+
+    Up to ``limit`` callers run at once and up to ``max_waiting`` more queue
+    for at most ``timeout`` seconds; anyone beyond that is rejected straight
+    away, so a slow upstream cannot tie up every request thread.
+    """
+
+    def __init__(self, name, limit=8, max_waiting=16, timeout=5.0):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self._active = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            if self._active >= self.limit:
+                if self._waiting >= self.max_waiting:
+                    self.rejected += 1
+                    raise AdmissionRejected(f"{self.name}: too many queued calls")
+                self._waiting += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self._active < self.limit, timeout=self.timeout)
+                finally:
+                    self._waiting -= 1
+                if not admitted:
+                    self.timed_out += 1
+                    raise AdmissionRejected(f"{self.name}: no capacity within {self.timeout}s")
+            self._active += 1
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'active': self._active,
+                'waiting': self._waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+            }
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets: ``rate`` tokens per second, bursts up to ``burst``."""
+
+    def __init__(self, rate=0.5, burst=5, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.limited = 0
+
+    def _prune(self, now):
+        # Buckets that have refilled completely carry no state worth keeping.
+        full_after = self.burst / self.rate if self.rate > 0 else float('inf')
+        for key in [key for key, (_, updated) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+
+    def allow(self, key, cost=1.0):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            else:
+                self.limited += 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return allowed
+
+    def stats(self):
+        with self._lock:
+            return {'tracked_keys': len(self._buckets), 'limited': self.limited}
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after ``failure_threshold`` consecutive failures.
+
+    While open every call is refused for ``reset_timeout`` seconds; then a
+    single trial call is let through and its outcome closes or reopens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = None
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.short_circuited = 0
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            if self.state == 'open' and now - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            # A trial whose caller never reported back must not keep the circuit shut forever.
+            if self.state == 'half_open' and (self._trial_started is None or now - self._trial_started >= self.reset_timeout):
+                self._trial_started = now
+                return True
+            self.short_circuited += 1
+            return False
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self._failures = 0
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_started = None
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.opened += 1
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self._failures,
+                'opened': self.opened,
+                'short_circuited': self.short_circuited,
+            }
@@ -0,0 +1,141 @@
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(text):
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = _PUNCTUATION.sub(' ', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class NgramMatcher:
+    """Finds a cached prompt whose character trigrams overlap the query's.
+
+    Similarity is the Jaccard index of the two trigram sets; an inverted index
+    from trigram to prompts keeps lookups proportional to the candidates that
+    share a trigram rather than to the cache size.
+    """
+
+    def __init__(self, threshold=0.8, n=3):
+        self.threshold = threshold
+        self.n = n
+        self._grams = {}
+        self._index = {}
+
+    def _ngrams(self, text):
+        padded = f" {text} "
+        return frozenset(padded[i:i + self.n] for i in range(max(1, len(padded) - self.n + 1)))
+
+    def add(self, key):
+        grams = self._ngrams(key[0])
+        self._grams[key] = grams
+        for gram in grams:
+            self._index.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        for gram in self._grams.pop(key, ()):
+            keys = self._index.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[gram]
+
+    def find(self, key):
+        grams = self._ngrams(key[0])
+        overlap = {}
+        for gram in grams:
+            for candidate in self._index.get(gram, ()):
+                if candidate[1] == key[1]:
+                    overlap[candidate] = overlap.get(candidate, 0) + 1
+        best, best_score = None, 0.0
+        for candidate, shared in overlap.items():
+            score = shared / (len(grams) + len(self._grams[candidate]) - shared)
+            if score > best_score:
+                best, best_score = candidate, score
+        return best if best_score >= self.threshold else None
+
+
+class ResponseCache:
+    """TTL + LRU cache of LLM answers keyed by (normalized prompt, language).
+
+    Exact normalized matches are checked first; if a ``matcher`` is given it
+    is asked for a near-identical cached prompt on a miss.
+    """
+
+    def __init__(self, max_entries=5000, ttl=3600.0, matcher=None, min_length=8):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.matcher = matcher
+        self.min_length = min_length
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remove(self, key):
+        del self._entries[key]
+        if self.matcher is not None:
+            self.matcher.remove(key)
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def get(self, prompt, language):
+        key = (normalize_prompt(prompt), language)
+        if len(key[0]) < self.min_length:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            value = self._live(key, now)
+            if value is not None:
+                self.hits += 1
+                return value
+            if self.matcher is not None:
+                similar = self.matcher.find(key)
+                value = self._live(similar, now) if similar is not None else None
+                if value is not None:
+                    self.similar_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, prompt, language, response):
+        key = (normalize_prompt(prompt), language)
+        if len(key[0]) < self.min_length or not response:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response, time.monotonic())
+            if self.matcher is not None:
+                self.matcher.add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.similar_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round((self.hits + self.similar_hits) / lookups, 4) if lookups else 0.0,
+            }
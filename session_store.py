@@ -0,0 +1,214 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+
+
+class LocalKeyValueStore:
+    """In-process stand-in for the subset of the Redis API used by ``RedisSessionBackend``."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    def incr(self, key):
+        with self._lock:
+            value, expires_at = self._data.get(key, (0, None))
+            if expires_at is not None and expires_at <= time.time():
+                value, expires_at = 0, None
+            value = int(value) + 1
+            self._data[key] = (value, expires_at)
+            return value
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._data[key] = (self._data[key][0], time.time() + seconds)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+
+class RedisSessionBackend:
+    """Persists serialized chat sessions in Redis (or anything with get/set/incr/expire/delete).
+
+    Each save takes the next number from a per-user version counter and stores
+    it with the session, so workers can tell whether their copy is current
+    with one small read.
+    """
+
+    def __init__(self, client, prefix='chat_session:', ttl=7 * 24 * 3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _version_key(self, user_id):
+        return self.prefix + str(user_id) + ':version'
+
+    def load(self, user_id):
+        """Return ``(data, version)``, or ``None`` if nothing is saved."""
+        raw = self.client.get(self.prefix + str(user_id))
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8')
+        data = json.loads(raw)
+        return data, data.pop('_version', 0)
+
+    def version(self, user_id):
+        raw = self.client.get(self._version_key(user_id))
+        return int(raw) if raw is not None else 0
+
+    def save(self, user_id, data):
+        # The counter moves first; a reader that sees it ahead of the data reloads again next time.
+        version = self.client.incr(self._version_key(user_id))
+        self.client.expire(self._version_key(user_id), self.ttl)
+        self.client.set(self.prefix + str(user_id), json.dumps(dict(data, _version=version)), ex=self.ttl)
+        return version
+
+    def delete(self, user_id):
+        self.client.delete(self.prefix + str(user_id), self._version_key(user_id))
+
+
+class SessionStore:
+    """Bounded LRU of live chat sessions with an optional shared backend.
+
+    At most ``max_sessions`` sessions stay in memory and any session idle for
+    longer than ``idle_ttl`` seconds is dropped. With a backend, sessions are
+    saved after every turn and a session that was evicted here (or created on
+    another worker) is rebuilt from its saved message history on next access.
+    A cached session is also reloaded when the backend holds a newer version,
+    i.e. another worker saved a turn since, so workers never build on a stale
+    copy. Two turns for one user running at the same moment on different
+    workers are still last-writer-wins.
+    """
+
+    def __init__(self, factory, restore, max_sessions=1000, idle_ttl=1800.0, backend=None):
+        self.factory = factory
+        self.restore = restore
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.backend = backend
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.rehydrated = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def _evict_expired(self, now):
+        while self._sessions:
+            user_id, (chat_session, last_used, version) = next(iter(self._sessions.items()))
+            if now - last_used <= self.idle_ttl:
+                break
+            del self._sessions[user_id]
+            self.evictions += 1
+
+    def _insert(self, user_id, chat_session, now, version=0):
+        self._sessions[user_id] = (chat_session, now, version)
+        self._sessions.move_to_end(user_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.get(user_id)
+            if entry is not None:
+                self._sessions[user_id] = (entry[0], now, entry[2])
+                self._sessions.move_to_end(user_id)
+                if self.backend is None:
+                    self.hits += 1
+                    return entry[0]
+
+        if entry is not None:
+            if self.backend.version(user_id) <= entry[2]:
+                with self._lock:
+                    self.hits += 1
+                return entry[0]
+        else:
+            with self._lock:
+                self.misses += 1
+            if self.backend is None:
+                return None
+
+        loaded = self.backend.load(user_id)
+        if loaded is None:
+            return entry[0] if entry is not None else None
+        data, version = loaded
+        chat_session = self.restore(data)
+        with self._lock:
+            # Another request may have loaded it meanwhile; keep whichever copy is newer.
+            current = self._sessions.get(user_id)
+            if current is not None and current[2] >= version:
+                return current[0]
+            if entry is not None:
+                self.reloads += 1
+            else:
+                self.rehydrated += 1
+            self._insert(user_id, chat_session, now, version)
+        return chat_session
+
+    def get_or_create(self, user_id):
+        chat_session = self.get(user_id)
+        if chat_session is not None:
+            return chat_session
+        chat_session = self.factory(user_id)
+        with self._lock:
+            entry = self._sessions.get(user_id)
+            if entry is not None:
+                return entry[0]
+            self._insert(user_id, chat_session, time.monotonic())
+        self.save(chat_session)
+        return chat_session
+
+    def save(self, chat_session):
+        if self.backend is None:
+            return
+        version = self.backend.save(chat_session.user_id, chat_session.to_dict())
+        with self._lock:
+            entry = self._sessions.get(chat_session.user_id)
+            if entry is not None and entry[0] is chat_session:
+                self._sessions[chat_session.user_id] = (chat_session, entry[1], version)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+        if self.backend is not None:
+            self.backend.delete(user_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'live_sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'hits': self.hits,
+                'misses': self.misses,
+                'rehydrated': self.rehydrated,
+                'reloads': self.reloads,
+                'evictions': self.evictions,
+                'backend': type(self.backend).__name__ if self.backend is not None else None,
+            }
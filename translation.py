@@ -0,0 +1,143 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def cache_key(text, language):
+    return hashlib.sha1(f"{language}\0{text}".encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """LRU of translated strings keyed by a hash of (language, text).
+
+    With ``path`` set, entries are loaded at startup and written back as JSON
+    every ``save_every`` new translations.
+    """
+
+    def __init__(self, max_entries=10000, path=None, save_every=50):
+        self.max_entries = max_entries
+        self.path = path
+        self.save_every = save_every
+        self._entries = OrderedDict()
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._entries.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Could not load translation cache from {path}: {e}")
+
+    def get(self, text, language):
+        key = cache_key(text, language)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, text, language, translated):
+        with self._lock:
+            self._entries[cache_key(text, language)] = translated
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty += 1
+            should_save = self.path and self._dirty >= self.save_every
+        if should_save:
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = dict(self._entries)
+            self._dirty = 0
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class TranslationService:
+    """Translates bot replies line by line through a ``TranslationCache``.
+
+    Only lines missing from the cache are sent to ``backend`` (a googletrans
+    ``Translator``), ``batch_size`` lines per request. Requests go through the
+    optional ``gate`` (a ``ConcurrencyGate``) and ``breaker`` (a ``CircuitBreaker``).
+    """
+
+    def __init__(self, backend, cache, batch_size=25, gate=None, breaker=None):
+        self.backend = backend
+        self.cache = cache
+        self.batch_size = batch_size
+        self.gate = gate
+        self.breaker = breaker
+
+    @property
+    def available(self):
+        return self.backend is not None
+
+    def _translate_batch(self, lines, language):
+        if self.gate is not None:
+            with self.gate.slot():
+                return self._call_backend(lines, language)
+        return self._call_backend(lines, language)
+
+    def _call_backend(self, lines, language):
+        # The breaker is checked only once admitted, so a rejected call never takes its half-open trial.
+        if self.breaker is not None:
+            self.breaker.check()
+        try:
+            results = self.backend.translate(lines, dest=language)
+        except Exception:
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            raise
+        if self.breaker is not None:
+            self.breaker.record_success()
+        if not isinstance(results, list):
+            results = [results]
+        return [result.text for result in results]
+
+    def translate(self, text, language):
+        if language == 'en' or not text or self.backend is None:
+            return text
+        lines = text.split('\n')
+        translated = {}
+        missing = []
+        for line in lines:
+            if not line.strip() or line in translated:
+                continue
+            cached = self.cache.get(line, language)
+            if cached is None:
+                translated[line] = None
+                missing.append(line)
+            else:
+                translated[line] = cached
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            for line, result in zip(batch, self._translate_batch(batch, language)):
+                translated[line] = result
+                self.cache.put(line, language, result)
+        return '\n'.join(translated.get(line) or line for line in lines)
+
+    def prewarm(self, texts, languages):
+        for language in languages:
+            if language == 'en':
+                continue
+            try:
+                self.translate('\n'.join(texts), language)
+            except Exception as e:
+                print(f"Translation prewarm failed for {language}: {e}")
+        self.cache.save()